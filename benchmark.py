@@ -0,0 +1,349 @@
+# benchmark.py (Offline throughput benchmark against a local Maps-like fixture server)
+#
+# Usage:
+#   python benchmark.py                                  # every scenario, default settings
+#   python benchmark.py --scenario flaky --repeat 3 --navigation-mode direct --workers 2 --json results.json
+
+import os, re, json, time, random, argparse, tempfile, threading, tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+# --- SCENARIOS ---
+
+# latency_ms: mean server delay per route; stale_rate: chance a feed page re-renders every loaded card
+# (stale elements); error_rate: chance a detail request fails with HTTP 500; missing_rate: chance an
+# optional detail field is left out; dup_rate: chance a listing reuses an earlier listing's address.
+SCENARIOS = {
+    'baseline': {'listings': 120, 'page_size': 20, 'latency_ms': {'search': 150, 'feed': 250, 'place': 200}},
+    'slow-network': {'listings': 120, 'page_size': 20, 'latency_ms': {'search': 600, 'feed': 1000, 'place': 800}},
+    'flaky': {'listings': 120, 'page_size': 20, 'latency_ms': {'search': 150, 'feed': 250, 'place': 200}, 'stale_rate': 0.2, 'error_rate': 0.05, 'missing_rate': 0.2},
+    'duplicates': {'listings': 120, 'page_size': 20, 'latency_ms': {'search': 150, 'feed': 250, 'place': 200}, 'dup_rate': 0.3},
+    'long-feed': {'listings': 600, 'page_size': 20, 'latency_ms': {'search': 150, 'feed': 250, 'place': 200}},
+    'marathon': {'listings': 2000, 'page_size': 20, 'latency_ms': {'search': 150, 'feed': 250, 'place': 200}},
+}
+
+# Short pacing delays so runs measure the scraper rather than its politeness sleeps (--delays default restores the engine's).
+FAST_DELAYS = {'short': (0, 0.2), 'medium': (0.2, 0.5), 'long': (0.5, 1)}
+
+# --- SYNTHETIC DATA ---
+
+def make_listings(scenario, seed):
+    rng = random.Random(seed)
+    listings = []
+    for i in range(scenario['listings']):
+        name = f"Fixture Business {i + 1}"
+        if listings and rng.random() < scenario.get('dup_rate', 0):
+            address = rng.choice(listings)['address']
+        else:
+            address = f"{100 + i} {rng.choice(['Main', 'Oak', 'Pine', 'Elm'])} St, Testville, TS {10000 + i}, United States"
+        listings.append({
+            'name': name,
+            'href': f"/maps/place/{name.replace(' ', '+')}/data=!4m7!3m6!1s0x{seed:x}:0x{i + 1:x}!8m2",
+            'rating': f"{rng.uniform(3, 5):.1f}",
+            'reviews': f"{rng.randint(1, 5000):,}",
+            'pricing': rng.choice(['$', '$$', '$$$']),
+            'address': address,
+            'website': f"/site/{i + 1}/?utm_source=maps",
+            'phone': f"+1 555-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            'hours': rng.choice(['Open ⋅ Closes 5 PM', 'Closed ⋅ Opens 9 AM Mon']),
+            'plus_code': f"GFQC+{rng.randint(10, 99)} Testville, TS, USA",
+            'missing': {field for field in ('pricing', 'website', 'hours', 'plus_code') if rng.random() < scenario.get('missing_rate', 0)},
+        })
+    return listings
+
+def render_detail_pane(listing):
+    parts = [f'<h1 class="DUwDvf">{listing["name"]}</h1>',
+             f'<div class="F7nice"><span>{listing["rating"]}</span><span>({listing["reviews"]})</span></div>']
+    if 'pricing' not in listing['missing']: parts.append(f'<span class="mgr77e">· {listing["pricing"]}</span>')
+    parts.append(f'<button data-item-id="address"><div>{listing["address"]}</div></button>')
+    if 'website' not in listing['missing']: parts.append(f'<a data-item-id="authority" href="{listing["website"]}">website</a>')
+    parts.append(f'<button data-item-id="phone:tel:{re.sub(r"[^0-9+]", "", listing["phone"])}"><div>{listing["phone"]}</div></button>')
+    if 'hours' not in listing['missing']: parts.append(f'<div jsaction="pane.openhours.toggle"><span class="ZDu9vd">{listing["hours"]}</span></div>')
+    if 'plus_code' not in listing['missing']: parts.append(f'<button data-item-id="oloc"><div>{listing["plus_code"]}</div></button>')
+    return '<div class="pane">' + ''.join(parts) + '</div>'
+
+def render_website(listing, page):
+    """A tiny business website: the homepage links to a contact page that holds the email address."""
+    slug = listing['name'].lower().replace(' ', '')
+    if page == 'contact':
+        body = f'<p>Write to <a href="mailto:hello@{slug}.test">hello@{slug}.test</a></p><a href="https://www.facebook.com/{slug}">Facebook</a>'
+    else:
+        body = f'<h1>{listing["name"]}</h1><a href="contact">Contact us</a><a href="https://www.instagram.com/{slug}/">Instagram</a>'
+    return f'<!doctype html><html><head><meta charset="utf-8"></head><body>{body}</body></html>'
+
+SEARCH_PAGE = """<!doctype html><html><head><meta charset="utf-8"><title>Fixture Maps</title>
+<style>#feed { height: 600px; width: 420px; overflow-y: auto; float: left; } #pane { margin-left: 440px; } a.hfpxzc { display: block; height: 90px; }</style>
+</head><body><div role="feed" id="feed" tabindex="0"></div><div id="pane"></div>
+<script>
+const feed = document.getElementById('feed');
+let page = 0, loading = false, finished = false;
+function card(item) {
+    const a = document.createElement('a');
+    a.className = 'hfpxzc'; a.href = item.href; a.textContent = item.name;
+    a.setAttribute('aria-label', item.name);
+    a.addEventListener('click', openPlace);
+    return a;
+}
+async function loadMore() {
+    if (loading || finished) return;
+    loading = true;
+    const response = await fetch('/api/feed?page=' + page);
+    const data = await response.json();
+    page += 1; loading = false;
+    if (!data.items.length) { finished = true; return; }
+    if (data.restale) feed.querySelectorAll('a.hfpxzc').forEach(a => a.replaceWith(card({href: a.getAttribute('href'), name: a.getAttribute('aria-label')})));
+    data.items.forEach(item => { const row = document.createElement('div'); row.appendChild(card(item)); feed.appendChild(row); });
+}
+async function openPlace(event) {
+    event.preventDefault();
+    const response = await fetch('/api/place?href=' + encodeURIComponent(this.getAttribute('href')));
+    if (response.ok) document.getElementById('pane').innerHTML = await response.text();
+}
+feed.addEventListener('scroll', () => { if (feed.scrollTop + feed.clientHeight >= feed.scrollHeight - 50) loadMore(); });
+feed.addEventListener('keydown', event => { if (event.key === 'End') loadMore(); });
+loadMore();
+</script></body></html>"""
+
+# --- FIXTURE SERVER ---
+
+class FixtureServer:
+    """Serves a synthetic results feed and detail panes shaped like the Google Maps markup run_scraper reads."""
+
+    def __init__(self, scenario, seed=1):
+        self.scenario = scenario
+        self.rng = random.Random(seed)
+        self.listings = make_listings(scenario, seed)
+        self.by_href = {listing['href']: listing for listing in self.listings}
+        self.route_timings = {'search': [], 'feed': [], 'place': [], 'site': []}
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def chance(self, key):
+        with self.lock: return self.rng.random() < self.scenario.get(key, 0)
+
+    def delay(self, route):
+        mean = self.scenario.get('latency_ms', {}).get(route, 0) / 1000
+        with self.lock: seconds = self.rng.uniform(mean * 0.5, mean * 1.5)
+        time.sleep(seconds)
+
+    def record(self, route, started):
+        with self.lock: self.route_timings[route].append(time.perf_counter() - started)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, as real sites (and the enrichment connection pool) expect
+
+            def log_message(self, *args): pass
+
+            def send(self, status, body, content_type='text/html; charset=utf-8'):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                started = time.perf_counter()
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path.startswith('/maps/search/'):
+                    server.delay('search')
+                    self.send(200, SEARCH_PAGE)
+                    server.record('search', started)
+                elif url.path == '/api/feed':
+                    server.delay('feed')
+                    page, size = int(query.get('page', ['0'])[0]), server.scenario['page_size']
+                    items = [{'name': l['name'], 'href': l['href']} for l in server.listings[page * size:(page + 1) * size]]
+                    self.send(200, json.dumps({'items': items, 'restale': page > 0 and server.chance('stale_rate')}), 'application/json')
+                    server.record('feed', started)
+                elif url.path == '/api/place' or url.path.startswith('/maps/place/'):
+                    server.delay('place')
+                    href = unquote(query['href'][0]) if url.path == '/api/place' else self.path
+                    listing = server.by_href.get(href) or server.by_href.get(unquote(href))
+                    if not listing or server.chance('error_rate'):
+                        self.send(500, '<html><body>Server error</body></html>')
+                    elif url.path == '/api/place':
+                        self.send(200, render_detail_pane(listing))
+                    else:
+                        self.send(200, f'<!doctype html><html><head><meta charset="utf-8"></head><body>{render_detail_pane(listing)}</body></html>')
+                    server.record('place', started)
+                elif match := re.fullmatch(r'/site/(\d+)/(contact)?', url.path):
+                    index = int(match.group(1)) - 1
+                    if 0 <= index < len(server.listings): self.send(200, render_website(server.listings[index], match.group(2)))
+                    else: self.send(404, 'Not found')
+                    server.record('site', started)
+                else:
+                    self.send(404, 'Not found')
+
+        return Handler
+
+# --- BROWSER MEMORY ---
+
+def _descendant_pids(root_pid):
+    """Every process below root_pid, read from /proc (Linux only)."""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit(): continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                parent = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            pids.append(child)
+            stack.append(child)
+    return pids
+
+def _rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            return next((int(line.split()[1]) for line in f if line.startswith('VmRSS:')), 0)
+    except OSError:
+        return 0
+
+class BrowserMemorySampler:
+    """Samples the summed RSS of every process this one spawned (chromedriver and its Chrome processes)
+    during one run, so each scenario reports its own peak rather than a process-wide maximum."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_kb = 0
+        self.supported = os.path.isdir('/proc')
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        if self.supported: self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        if self.supported: self.thread.join()
+
+    def _run(self):
+        while True:
+            self.peak_kb = max(self.peak_kb, sum(_rss_kb(pid) for pid in _descendant_pids(os.getpid())))
+            if self.stop_event.wait(self.interval): break
+
+    @property
+    def peak_mb(self):
+        return self.peak_kb / 1024 if self.supported else None
+
+# --- HARNESS ---
+
+def percentile(values, pct):
+    if not values: return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))]
+
+def summarize(values):
+    return {f"p{pct}": percentile(values, pct) for pct in (50, 90, 99)}
+
+def run_scenario(name, run_params, seed=1):
+    """Runs run_scraper once against a fresh fixture server and returns the measurements."""
+    from scraper_engine import run_scraper
+    from output_sinks import read_rows
+    from metrics import load_stage_timings
+    scenario = SCENARIOS[name]
+    lead_times = []
+    with FixtureServer(scenario, seed) as server, tempfile.TemporaryDirectory() as workdir:
+        filepath = os.path.join(workdir, f"bench.{run_params.get('output_format') or 'csv'}")
+        params = {'keyword': 'fixture', 'location': 'Testville', 'country': 'TS', 'headless': True,
+                  'target_leads': scenario['listings'], 'filepath': filepath, 'processed_addresses': set(),
+                  'base_url': server.base_url, 'resume': False, 'delays': FAST_DELAYS,
+                  'metrics_path': os.path.join(workdir, "bench.metrics.jsonl"), **run_params}
+
+        def update_callback(message):
+            if 'Lead #' in message: lead_times.append(time.perf_counter())
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        with BrowserMemorySampler() as browser_memory:
+            summary = run_scraper(params, update_callback, threading.Event())
+        elapsed = time.perf_counter() - started
+        python_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rows = sum(1 for _ in read_rows(filepath)) if os.path.exists(filepath) else 0
+        stage_timings = load_stage_timings(params['metrics_path'])
+
+    intervals = [b - a for a, b in zip([started] + lead_times, lead_times)]
+    quarter = len(intervals) // 4
+    return {
+        'scenario': name,
+        'seed': seed,
+        'leads': rows,
+        'elapsed_s': elapsed,
+        'leads_per_min': rows / elapsed * 60 if elapsed else 0,
+        'time_to_first_lead_s': lead_times[0] - started if lead_times else None,
+        'lead_interval_s': summarize(intervals),
+        # Mean lead interval in the last quarter of the run over the first; ~1.0 means long runs do not slow down.
+        'slowdown': sum(intervals[-quarter:]) / sum(intervals[:quarter]) if quarter else None,
+        'browser_recycles': summary['metrics']['counters'].get('recycles', 0),
+        'stage_s': {stage: summarize(timings) for stage, timings in stage_timings.items()},
+        'server_latency_s': {route: summarize(timings) for route, timings in server.route_timings.items()},
+        'requests': {route: len(timings) for route, timings in server.route_timings.items()},
+        'python_peak_mb': python_peak / 1024 / 1024,
+        'browser_peak_rss_mb': browser_memory.peak_mb,
+    }
+
+def format_result(result):
+    def fmt(value): return "-" if value is None else f"{value:.2f}"
+    latency = ", ".join(f"{route} p50/p90 {fmt(stats['p50'])}/{fmt(stats['p90'])}s" for route, stats in result['server_latency_s'].items())
+    stages = ", ".join(f"{stage} {fmt(stats['p50'])}/{fmt(stats['p90'])}/{fmt(stats['p99'])}s" for stage, stats in result['stage_s'].items())
+    return (f"{result['scenario']:<14} seed={result['seed']:<3} leads={result['leads']:<4} {result['leads_per_min']:7.1f} leads/min  "
+            f"first={fmt(result['time_to_first_lead_s'])}s  lead p50/p90/p99 {fmt(result['lead_interval_s']['p50'])}/"
+            f"{fmt(result['lead_interval_s']['p90'])}/{fmt(result['lead_interval_s']['p99'])}s  slowdown {fmt(result['slowdown'])}x  "
+            f"recycles {result['browser_recycles']}  [{latency}]  "
+            f"py peak {result['python_peak_mb']:.1f} MB, browser peak {fmt(result['browser_peak_rss_mb'])} MB\n"
+            f"{'':<14} stage p50/p90/p99: {stages or '-'}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark run_scraper against a local Maps-like fixture server.")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable). Default: all.")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scenario; run N uses seed N.")
+    parser.add_argument("--target", type=int, help="Stop after this many leads (default: every listing).")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--navigation-mode", choices=['click', 'direct'], default='click')
+    parser.add_argument("--extraction-mode", choices=['elements', 'batched'], default='elements')
+    parser.add_argument("--browsing-profile", choices=['default', 'lean'], default='default')
+    parser.add_argument("--enrich", action="store_true", help="Crawl each lead's (fixture) website for emails and social links.")
+    parser.add_argument("--no-prune", action="store_true", help="Keep processed cards in the results feed.")
+    parser.add_argument("--recycle-every", type=int, default=0, help="Replace the browser after this many pages (0: only past the memory limits).")
+    parser.add_argument("--delays", choices=['fast', 'default'], default='fast', help="'default' keeps the engine's own pacing delays.")
+    parser.add_argument("--json", help="Write all results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    run_params = {'workers': args.workers, 'navigation_mode': args.navigation_mode, 'extraction_mode': args.extraction_mode,
+                  'browsing_profile': args.browsing_profile, 'detail_timeout': 5, 'enrich_websites': args.enrich,
+                  'prune_feed': not args.no_prune, 'recycle_every': args.recycle_every}
+    if args.delays == 'default': run_params['delays'] = None
+    if args.target: run_params['target_leads'] = args.target
+
+    results = []
+    for name in args.scenario or sorted(SCENARIOS):
+        for seed in range(1, args.repeat + 1):
+            result = run_scenario(name, run_params, seed)
+            print(format_result(result), flush=True)
+            results.append(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'params': run_params, 'results': results}, f, indent=2)
+    return results
+
+if __name__ == "__main__":
+    main()
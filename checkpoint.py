@@ -0,0 +1,78 @@
+# checkpoint.py (Crash-safe progress file for resuming an interrupted scrape)
+
+import os, json, time, threading
+
+class Checkpoint:
+    """Tracks the search URL, harvested listing links, finished links and feed scroll depth of a run.
+
+    The state is written atomically (temp file + rename) at most every `save_interval` seconds and
+    whenever the run ends early, so a restarted job can jump straight to the unprocessed listings.
+    """
+
+    def __init__(self, path, search_url, save_interval=5.0):
+        self.path = path
+        self.search_url = search_url
+        self.save_interval = save_interval
+        self.harvested = {}
+        self.done = set()
+        self.scroll_depth = 0
+        self.resumed = False
+        self.last_save = 0.0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load_or_create(cls, path, search_url, update_callback, resume=True):
+        checkpoint = cls(path, search_url)
+        if not resume or not os.path.exists(path): return checkpoint
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except Exception as e:
+            update_callback(f"-> Ignoring unreadable checkpoint '{path}'. Error: {e}")
+            return checkpoint
+        if state.get('search_url') != search_url:
+            update_callback("-> Checkpoint belongs to a different search. Starting fresh.")
+            return checkpoint
+        checkpoint.harvested = dict(state.get('harvested', []))
+        checkpoint.done = set(state.get('done', []))
+        checkpoint.scroll_depth = state.get('scroll_depth', 0)
+        checkpoint.resumed = True
+        update_callback(f"-> Resuming from checkpoint: {len(checkpoint.harvested)} listings harvested, {len(checkpoint.done)} done, "
+                        f"{len(checkpoint.pending_links())} pending, scroll depth {checkpoint.scroll_depth}.")
+        return checkpoint
+
+    def pending_links(self):
+        """Harvested (href, name) pairs not finished yet, in harvest order."""
+        with self.lock:
+            return [(href, name) for href, name in self.harvested.items() if href not in self.done]
+
+    def add_harvested(self, links):
+        with self.lock:
+            for href, name in links: self.harvested.setdefault(href, name)
+        self.save_if_due()
+
+    def add_scroll(self):
+        with self.lock: self.scroll_depth += 1
+
+    def mark_done(self, hrefs):
+        with self.lock: self.done.update(href for href in hrefs if href)
+        self.save_if_due()
+
+    def save_if_due(self):
+        if time.monotonic() - self.last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        with self.lock:
+            state = {'search_url': self.search_url, 'harvested': list(self.harvested.items()), 'done': sorted(self.done),
+                     'scroll_depth': self.scroll_depth, 'updated': time.time()}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+            self.last_save = time.monotonic()
+
+    def complete(self):
+        """The run finished its work; the checkpoint is no longer needed."""
+        with self.lock:
+            if os.path.exists(self.path): os.remove(self.path)
@@ -0,0 +1,190 @@
+# cli.py (Headless command line and batch job runner; no display needed)
+#
+# Usage:
+#   python cli.py run --keyword "dentist" --location "Austin, TX" --country "USA" --leads 200 --output scraped_leads/dentists.csv
+#   python cli.py batch jobs.csv --concurrency 3 --output-dir scraped_leads --summary scraped_leads/summary.json
+#
+# A jobs file is CSV or JSON lines with one job per row/line (keyword, location, country and optionally
+# target_leads, output, dedup_index, workers, navigation_mode, search_mode, ...), or a JSON object
+# {"keywords": [...], "locations": [...], "countries": [...], "defaults": {...}} that expands to every combination.
+
+import os, re, csv, sys, json, time, signal, argparse, threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+DEDUP_INDEX_FILENAME = "dedup_index.db"
+# Job fields passed through to run_scraper, with the type they are read as from CSV/JSON.
+JOB_PARAMS = {
+    'target_leads': int, 'workers': int, 'navigation_mode': str, 'extraction_mode': str, 'search_mode': str,
+    'browsing_profile': str, 'output_format': str, 'enrich_websites': bool, 'pacing': str, 'tile_grid': int,
+}
+
+# --- JOBS ---
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', str(text).lower()).strip('_') or 'job'
+
+def _coerce(value, kind):
+    if kind is bool and isinstance(value, str): return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return kind(value)
+
+def load_jobs(path):
+    """Reads a jobs file (CSV, JSON lines, or a JSON cross-product spec) into a list of job dicts."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if extension == '.csv':
+            jobs = [{key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()} for row in csv.DictReader(f)]
+        elif extension == '.json':
+            spec = json.load(f)
+            jobs = spec if isinstance(spec, list) else [
+                {**spec.get('defaults', {}), 'keyword': keyword, 'location': location, 'country': country}
+                for keyword in spec['keywords'] for location in spec['locations'] for country in spec.get('countries', [''])]
+        else:
+            jobs = [json.loads(line) for line in f if line.strip()]
+    for number, job in enumerate(jobs, 1):
+        missing = [key for key in ('keyword', 'location') if not job.get(key)]
+        if missing: raise ValueError(f"Job {number} in '{path}' is missing {', '.join(missing)}.")
+        job.setdefault('country', '')
+    return jobs
+
+def job_params(job, defaults, output_dir):
+    """Builds run_scraper params for one job; the job's own settings win over the command line defaults."""
+    params = {'keyword': job['keyword'], 'location': job['location'], 'country': job['country'], 'headless': defaults['headless'], 'processed_addresses': set()}
+    for key, kind in JOB_PARAMS.items():
+        value = job.get(key, defaults.get(key))
+        if value not in (None, ''): params[key] = _coerce(value, kind)
+    extension = {'jsonl': '.jsonl', 'sqlite': '.db', 'parquet': '.parquet'}.get(params.get('output_format'), '.csv')
+    params['filepath'] = job.get('output') or os.path.join(output_dir, f"{_slug(job['keyword'])}_{_slug(job['location'])}_{_slug(job['country'])}{extension}")
+    output_stem = os.path.splitext(params['filepath'])[0]
+    params['metrics_path'] = output_stem + ".metrics.jsonl"
+    if defaults.get('prometheus'): params['metrics_prometheus_path'] = output_stem + ".prom"
+    return params
+
+# --- RUNNER ---
+
+class BatchRunner:
+    """Runs jobs through run_scraper, at most `concurrency` at a time. Jobs that share a dedup index file share one open index."""
+
+    def __init__(self, concurrency=1, output_dir="scraped_leads", dedup=True, stop_event=None):
+        self.concurrency = max(1, int(concurrency))
+        self.output_dir = output_dir
+        self.dedup = dedup
+        self.stop_event = stop_event or threading.Event()
+        self.indexes = {}
+        self.lock = threading.Lock()
+        self.print_lock = threading.Lock()
+
+    def log(self, message):
+        with self.print_lock: print(message, flush=True)
+
+    def dedup_index_for(self, job, filepath, update_callback):
+        """Opens (once) the job's dedup index and indexes the job's existing output file into it."""
+        from dedup_index import open_dedup_index
+        if not _coerce(job.get('dedup', self.dedup), bool): return None
+        index_path = job.get('dedup_index') or os.path.join(os.path.dirname(filepath) or '.', DEDUP_INDEX_FILENAME)
+        with self.lock:
+            index = self.indexes.get(os.path.abspath(index_path))
+            if index is None:
+                index = self.indexes[os.path.abspath(index_path)] = open_dedup_index(index_path, None, update_callback, job['country'])
+            if os.path.exists(filepath) and os.path.getsize(filepath) > 0 and not index.is_indexed(filepath):
+                update_callback(f"-> Indexing existing leads from '{os.path.basename(filepath)}' (one-time)...")
+                index.import_file(filepath, job['country'])
+        return index
+
+    def run_job(self, number, job, params, defaults):
+        from scraper_engine import run_scraper
+        label = f"[{number}] {job['keyword']} / {job['location']}"
+        summary = {'job': number, 'keyword': job['keyword'], 'location': job['location'], 'country': job['country'], 'output': params['filepath']}
+        if self.stop_event.is_set():
+            return {**summary, 'status': 'skipped'}
+        os.makedirs(os.path.dirname(os.path.abspath(params['filepath'])), exist_ok=True)
+        log_file = open(os.path.splitext(params['filepath'])[0] + ".log", 'a', encoding='utf-8', buffering=1)
+
+        def update_callback(message):
+            log_file.write(message + "\n")
+            if message.strip() and (defaults.get('verbose') or not message.startswith("  ->")):
+                self.log(f"{label}: {message.strip()}")
+
+        try:
+            params['dedup_index'] = self.dedup_index_for(job, params['filepath'], update_callback)
+            result = run_scraper(params, update_callback, self.stop_event)
+        except Exception as e:
+            update_callback(f"An unexpected error occurred: {e}")
+            result = {'leads': 0, 'finished': False, 'stopped': False, 'error': str(e)}
+        finally:
+            log_file.close()
+        status = 'error' if result.get('error') else 'finished' if result.get('finished') else 'stopped' if result.get('stopped') else 'incomplete'
+        return {**summary, 'status': status, **result}
+
+    def run(self, jobs, defaults):
+        started = time.time()
+        job_list = [(number, job, job_params(job, defaults, self.output_dir)) for number, job in enumerate(jobs, 1)]
+        outputs = Counter(os.path.abspath(params['filepath']) for _, _, params in job_list)
+        shared = sorted(output for output, count in outputs.items() if count > 1)
+        if shared: raise ValueError(f"Several jobs write to the same output file: {', '.join(shared)}")
+        self.log(f"-> {len(jobs)} jobs, {self.concurrency} at a time.")
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                results = list(executor.map(lambda item: self.run_job(*item, defaults), job_list))
+        finally:
+            for index in self.indexes.values(): index.close()
+        totals = {status: sum(1 for result in results if result['status'] == status) for status in ('finished', 'incomplete', 'stopped', 'skipped', 'error')}
+        return {'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(started)), 'elapsed_s': round(time.time() - started, 1),
+                'concurrency': self.concurrency, 'jobs': len(jobs), 'leads': sum(result.get('leads', 0) for result in results),
+                'status_counts': totals, 'results': results}
+
+# --- COMMAND LINE ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Google Maps scrapes without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run a single search.")
+    run_parser.add_argument("--keyword", required=True)
+    run_parser.add_argument("--location", required=True)
+    run_parser.add_argument("--country", default="")
+    run_parser.add_argument("--output", help="Output file; its extension picks the format (default: <output-dir>/<keyword>_<location>_<country>.csv).")
+    batch_parser = subparsers.add_parser("batch", help="Run every job in a jobs file.")
+    batch_parser.add_argument("jobs_file")
+    batch_parser.add_argument("--concurrency", type=int, default=1, help="Jobs run at the same time (each uses --workers browsers).")
+    for sub in (run_parser, batch_parser):
+        sub.add_argument("--leads", type=int, default=100, help="Target leads per job.")
+        sub.add_argument("--workers", type=int, default=1, help="Browser workers per job.")
+        sub.add_argument("--output-dir", default="scraped_leads")
+        sub.add_argument("--navigation-mode", choices=['click', 'direct'])
+        sub.add_argument("--extraction-mode", choices=['elements', 'batched'])
+        sub.add_argument("--search-mode", choices=['single', 'tiled'])
+        sub.add_argument("--browsing-profile", choices=['default', 'lean'])
+        sub.add_argument("--format", dest="output_format", choices=['csv', 'jsonl', 'sqlite', 'parquet'])
+        sub.add_argument("--enrich", dest="enrich_websites", action="store_true", default=None, help="Crawl lead websites for emails and social links.")
+        sub.add_argument("--no-dedup", action="store_true", help="Do not use the persistent dedup index.")
+        sub.add_argument("--show-browser", action="store_true", help="Run Chrome with a visible window.")
+        sub.add_argument("--prometheus", action="store_true", help="Also keep a Prometheus text file per job.")
+        sub.add_argument("--summary", help="Write the JSON run summary here (default: <output-dir>/run_summary_<time>.json).")
+        sub.add_argument("--verbose", action="store_true", help="Print every log line, not only the main steps.")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        jobs = [{'keyword': args.keyword, 'location': args.location, 'country': args.country, **({'output': args.output} if args.output else {})}]
+    else:
+        jobs = load_jobs(args.jobs_file)
+    defaults = {'headless': not args.show_browser, 'target_leads': args.leads, 'workers': args.workers, 'prometheus': args.prometheus, 'verbose': args.verbose,
+                **{key: getattr(args, key) for key in ('navigation_mode', 'extraction_mode', 'search_mode', 'browsing_profile', 'output_format', 'enrich_websites')}}
+
+    stop_event = threading.Event()
+    def request_stop(signum, frame):
+        print("\n--- STOP SIGNAL RECEIVED: finishing current listings and saving checkpoints ---", flush=True)
+        stop_event.set()
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, 'SIGTERM'): signal.signal(signal.SIGTERM, request_stop)
+
+    runner = BatchRunner(getattr(args, 'concurrency', 1), args.output_dir, not args.no_dedup, stop_event)
+    summary = runner.run(jobs, defaults)
+    summary_path = args.summary or os.path.join(args.output_dir, f"run_summary_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"-> {summary['leads']} leads from {summary['jobs']} jobs in {summary['elapsed_s'] / 60:.1f} min {summary['status_counts']}. Summary: {summary_path}", flush=True)
+    return 1 if summary['status_counts']['error'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
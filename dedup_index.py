@@ -0,0 +1,389 @@
+# dedup_index.py (Persistent duplicate index shared across output files and campaigns)
+
+import os, re, json, sqlite3, tempfile, threading, argparse
+from collections import namedtuple
+from difflib import SequenceMatcher
+from output_sinks import read_rows, open_sink
+
+# Bump when key normalization changes; older indexes are rebuilt from the lead files their rows came from.
+KEY_VERSION = 5
+NAME_SIMILARITY = 0.9
+SAME_SITE_NAME_SIMILARITY = 0.85
+
+# --- KEY NORMALIZATION ---
+
+ADDRESS_TOKENS = {
+    'suite': 'unit', 'ste': 'unit', 'apt': 'unit', 'apartment': 'unit', 'unit': 'unit', 'rm': 'unit', 'room': 'unit',
+    'street': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'boulevard': 'blvd', 'drive': 'dr', 'lane': 'ln',
+    'court': 'ct', 'place': 'pl', 'highway': 'hwy', 'parkway': 'pkwy', 'square': 'sq', 'floor': 'fl',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w', 'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+}
+COUNTRY_CALLING_CODES = {
+    'united states': '1', 'usa': '1', 'us': '1', 'canada': '1', 'ca': '1', 'united kingdom': '44', 'uk': '44', 'gb': '44',
+    'australia': '61', 'au': '61', 'new zealand': '64', 'nz': '64', 'ireland': '353', 'ie': '353', 'india': '91', 'in': '91',
+    'germany': '49', 'deutschland': '49', 'de': '49', 'france': '33', 'fr': '33', 'spain': '34', 'es': '34', 'italy': '39', 'it': '39',
+    'netherlands': '31', 'nl': '31', 'belgium': '32', 'be': '32', 'switzerland': '41', 'ch': '41', 'austria': '43', 'at': '43',
+    'mexico': '52', 'mx': '52', 'brazil': '55', 'br': '55', 'south africa': '27', 'za': '27', 'singapore': '65', 'sg': '65',
+    'united arab emirates': '971', 'uae': '971', 'ae': '971', 'philippines': '63', 'ph': '63', 'pakistan': '92', 'pk': '92',
+}
+POSTAL_CODE_PATTERNS = [
+    re.compile(r'\b[A-Z]{1,2}\d[A-Z\d]? ?\d[A-Z]{2}\b'),  # UK
+    re.compile(r'\b[A-Z]\d[A-Z] ?\d[A-Z]\d\b'),           # Canada
+    re.compile(r'\b\d{5}(?:-\d{4})?\b'),                  # US and most of Europe
+    re.compile(r'\b\d{4,6}\b'),
+]
+NAME_STOPWORDS = {'the', 'llc', 'inc', 'ltd', 'co', 'corp', 'company', 'limited', 'gmbh', 'plc', 'pty', 'srl', 'sa'}
+
+def _missing(value):
+    return not value or value == "Not Found"
+
+def normalize_address(address):
+    """Lowercases, expands unit markers ('#115', 'Ste 115' -> 'unit 115'), shortens street types and drops a trailing country."""
+    if _missing(address): return None
+    parts = [part.strip() for part in address.split(',')]
+    if len(parts) > 1 and parts[-1].lower().strip('. ') in COUNTRY_CALLING_CODES: parts = parts[:-1]
+    text = re.sub(r'#\s*', ' unit ', ', '.join(parts).lower())
+    tokens = [ADDRESS_TOKENS.get(token, token) for token in re.sub(r'[^\w\s]', ' ', text).split()]
+    return ' '.join(tokens) or None
+
+def normalize_phone(phone, country=None):
+    """E.164 ('+15551234567') when the country code is known or can be taken from `country`; bare digits otherwise."""
+    if _missing(phone): return None
+    digits = re.sub(r'\D', '', phone)
+    if len(digits) < 7: return None
+    if phone.strip().startswith('+'): return '+' + digits
+    if digits.startswith('00'): return '+' + digits[2:]
+    calling_code = COUNTRY_CALLING_CODES.get((country or '').strip().lower())
+    if not calling_code: return digits
+    if calling_code == '1' and len(digits) == 11 and digits.startswith('1'): return '+' + digits
+    return '+' + calling_code + digits.lstrip('0')
+
+def normalize_plus_code(plus_code):
+    """'GFQC+23 Testville, TS, USA' -> 'gfqc+23 testville'; a global code ('87G8Q2GF+23') stands on its own."""
+    if _missing(plus_code): return None
+    match = re.match(r'\s*([23456789CFGHJMPQRVWX]{2,8}\+[23456789CFGHJMPQRVWX]{0,3})\s*,?\s*([^,]*)', plus_code.upper())
+    if not match: return None
+    code, locality = match.group(1).lower(), re.sub(r'[^\w\s]', ' ', match.group(2).lower()).strip()
+    return code if len(code.split('+')[0]) == 8 or not locality else f"{code} {' '.join(locality.split())}"
+
+def postal_code(address):
+    """The last postal code after the street segment, so a house number like '12345 Research Blvd' is never taken for one."""
+    if _missing(address): return None
+    text = address.upper().split(',', 1)[1] if ',' in address else address.upper()
+    for pattern in POSTAL_CODE_PATTERNS:
+        matches = pattern.findall(text)
+        if matches: return matches[-1].replace(' ', '').lower()
+    return None
+
+def normalize_name(name):
+    if _missing(name): return None
+    text = re.sub(r"['’]", '', name.lower()).replace('&', ' and ')
+    tokens = [token for token in re.sub(r'[^\w\s]', ' ', text).split() if token not in NAME_STOPWORDS]
+    return ' '.join(tokens) or None
+
+def name_similarity(a, b):
+    """The higher of the character-level ratio and the token overlap of two normalized names."""
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    return max(SequenceMatcher(None, a, b).ratio(), len(tokens_a & tokens_b) / len(tokens_a | tokens_b))
+
+def extract_place_id(url):
+    """Pulls the stable place identifier (feature id or ChIJ place id) out of a Google Maps place URL."""
+    if not url: return None
+    match = re.search(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)', url) or re.search(r'(?:!19s|place_id[=:])(ChIJ[\w-]+)', url)
+    return match.group(1) if match else None
+
+def lead_keys(lead_data, place_url=None, country=None):
+    """Returns the exact (kind, key) pairs a lead is deduplicated on."""
+    keys = [
+        ('address', normalize_address(lead_data.get("Full Business Address"))),
+        ('phone', normalize_phone(lead_data.get("Phone Number"), country)),
+        ('place', extract_place_id(place_url)),
+    ]
+    return [(kind, key) for kind, key in keys if key]
+
+def name_blocks(lead_data, keys=()):
+    """(block, identity) pairs a lead's name is compared within, so near-duplicate names are only checked
+    against the few leads at the same street number or plus code (one building, so a slightly looser name
+    match is enough) or in the same postal area, never against every row.
+
+    identity is 'house number|unit number|phone|place id' (parts may be empty); two leads whose identities
+    both give a part and disagree on it are never the same business, whatever their names.
+    """
+    name = normalize_name(lead_data.get("Business Name"))
+    if not name: return []
+    keys = dict(keys)
+    address_key = keys.get('address') or ''
+    number_match = re.match(r'(\d+[a-z]?)\s+(?:[ewns]\s+)?(\w+)', address_key)
+    unit_match = re.search(r'\bunit (\w+)', address_key)
+    identity = "|".join([number_match.group(1) if number_match else '', unit_match.group(1) if unit_match else '',
+                        keys.get('phone') or '', keys.get('place') or ''])
+    blocks = [(f"street:{number_match.group(1)} {number_match.group(2)}", identity)] if number_match else []
+    areas = [postal_code(lead_data.get("Full Business Address"))]
+    plus_code = normalize_plus_code(lead_data.get("Plus Code"))
+    if plus_code:
+        blocks.append((f"plus:{plus_code}", identity))
+        if ' ' in plus_code: areas.append(plus_code.split(' ', 1)[1])
+    blocks += [(f"area:{area}:{name.split()[0][:3]}", identity) for area in areas if area]
+    return blocks
+
+Match = namedtuple('Match', 'reason source')
+
+class LeadFingerprint:
+    """What a lead is deduplicated on: exact keys plus the blocks its name is fuzzily compared within."""
+
+    def __init__(self, lead_data, place_url=None, country=None):
+        self.keys = lead_keys(lead_data, place_url, country)
+        self.name = normalize_name(lead_data.get("Business Name"))
+        self.blocks = name_blocks(lead_data, self.keys)
+
+def _different_identity(identity_a, identity_b):
+    """True when two 'house|unit|phone|place' identities both give some part and disagree on it."""
+    return any(a and b and a != b for a, b in zip((identity_a or '').split('|'), (identity_b or '').split('|')))
+
+def _name_match(fingerprint, candidates, threshold):
+    """candidates: (block, name, identity, source). A different house number, unit, phone or place id vetoes a
+    match. Within one site, names must also be similar enough for the area threshold or one must contain the
+    other ('Hilltop Auto Repair' / '... Shop'), so 'Dr John Smith' and 'Dr Jane Smith' stay apart. Returns the first Match or None."""
+    for block, name, identity, source in candidates:
+        if any(b == block and _different_identity(own, identity) for b, own in fingerprint.blocks): continue
+        similarity = name_similarity(fingerprint.name, name)
+        if block.startswith('area:'): matched = similarity >= threshold
+        else:
+            tokens, other_tokens = set(fingerprint.name.split()), set(name.split())
+            matched = similarity >= SAME_SITE_NAME_SIMILARITY and (similarity >= threshold or tokens <= other_tokens or other_tokens <= tokens)
+        if matched: return Match(f"name {similarity:.0%} like '{name}'", source)
+    return None
+
+# --- INDEX ---
+
+class MemoryIndex:
+    """In-memory index with the same match/add interface, for rows not yet committed to a DedupIndex."""
+
+    def __init__(self, threshold=NAME_SIMILARITY):
+        self.threshold = threshold
+        self.keys = {}
+        self.names = {}
+
+    def match(self, fingerprint):
+        for kind, key in fingerprint.keys:
+            if (kind, key) in self.keys: return Match(kind, self.keys[(kind, key)])
+        candidates = [(block, name, number, source) for block, _ in fingerprint.blocks for name, number, source in self.names.get(block, ())]
+        return _name_match(fingerprint, candidates, self.threshold) if fingerprint.name else None
+
+    def add(self, fingerprints, source=None):
+        for fingerprint in fingerprints:
+            for key in fingerprint.keys: self.keys.setdefault(key, source)
+            for block, number in fingerprint.blocks: self.names.setdefault(block, []).append((fingerprint.name, number, source))
+
+    def remove(self, fingerprints):
+        for fingerprint in fingerprints:
+            for key in fingerprint.keys: self.keys.pop(key, None)
+            for block, _ in fingerprint.blocks:
+                entries = [entry for entry in self.names.get(block, ()) if entry[0] != fingerprint.name]
+                if entries: self.names[block] = entries
+                else: self.names.pop(block, None)
+
+class DedupIndex:
+    """SQLite-backed set of dedup keys plus blocked business names. Opening it costs nothing per stored row, and rows are added as leads are written."""
+
+    def __init__(self, path, threshold=NAME_SIMILARITY):
+        self.path = path
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dedup_keys (kind TEXT NOT NULL, key TEXT NOT NULL, source TEXT, PRIMARY KEY (kind, key)) WITHOUT ROWID")
+        # dedup_names.house_number holds the full 'house|unit|phone|place' identity from name_blocks().
+        self.conn.execute("CREATE TABLE IF NOT EXISTS dedup_names (block TEXT NOT NULL, name TEXT NOT NULL, house_number TEXT, source TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS dedup_names_block ON dedup_names (block)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS indexed_sources (path TEXT PRIMARY KEY, rows INTEGER NOT NULL)")
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        self.outdated = version < KEY_VERSION and (self.conn.execute("SELECT 1 FROM indexed_sources LIMIT 1").fetchone() is not None
+                                                   or self.conn.execute("SELECT 1 FROM dedup_keys LIMIT 1").fetchone() is not None)
+        self.conn.execute(f"PRAGMA user_version = {KEY_VERSION}")
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM dedup_keys WHERE kind = 'address'").fetchone()[0]
+
+    def match(self, fingerprint):
+        """Returns a Match for the first exact key or similar name already in the index, or None."""
+        with self.lock:
+            for kind, key in fingerprint.keys:
+                row = self.conn.execute("SELECT source FROM dedup_keys WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+                if row: return Match(kind, row[0])
+            if not fingerprint.name or not fingerprint.blocks: return None
+            candidates = []
+            for block, _ in fingerprint.blocks:
+                candidates += [(block, name, number, source) for name, number, source in
+                               self.conn.execute("SELECT name, house_number, source FROM dedup_names WHERE block = ?", (block,))]
+        return _name_match(fingerprint, candidates, self.threshold)
+
+    def add(self, fingerprints, source=None, commit=True):
+        with self.lock:
+            for fingerprint in fingerprints: self._insert(fingerprint, source)
+            if commit: self.conn.commit()
+
+    def add_written(self, fingerprints, source):
+        """Adds rows a run has just written to `source` and records that file as indexed, so it is never re-imported."""
+        with self.lock:
+            for fingerprint in fingerprints: self._insert(fingerprint, source)
+            self.conn.execute("INSERT INTO indexed_sources (path, rows) VALUES (?, ?) ON CONFLICT (path) DO UPDATE SET rows = rows + excluded.rows",
+                              (source, len(fingerprints)))
+            self.conn.commit()
+
+    def commit(self):
+        with self.lock: self.conn.commit()
+
+    def _insert(self, fingerprint, source):
+        # Caller holds self.lock.
+        self.conn.executemany("INSERT OR IGNORE INTO dedup_keys (kind, key, source) VALUES (?, ?, ?)", [(kind, key, source) for kind, key in fingerprint.keys])
+        if fingerprint.name:
+            self.conn.executemany("INSERT INTO dedup_names (block, name, house_number, source) VALUES (?, ?, ?, ?)",
+                                  [(block, fingerprint.name, number, source) for block, number in fingerprint.blocks])
+
+    def is_indexed(self, source):
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM indexed_sources WHERE path = ?", (os.path.abspath(source),)).fetchone() is not None
+
+    def indexed_sources(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT path FROM indexed_sources")]
+
+    def sources(self):
+        """Every lead file the index holds rows from: imported files and the outputs runs have written to."""
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT path FROM indexed_sources UNION SELECT DISTINCT source FROM dedup_keys WHERE source IS NOT NULL")]
+
+    def import_file(self, filepath, country=None):
+        """Adds every row of an existing lead file (any output format) to the index. Returns the number of rows read."""
+        source = os.path.abspath(filepath)
+        rows = 0
+        with self.lock:
+            for row in read_rows(filepath):
+                rows += 1
+                self._insert(LeadFingerprint(row, country=country), source)
+            self.conn.execute("INSERT OR REPLACE INTO indexed_sources (path, rows) VALUES (?, ?)", (source, rows))
+            self.conn.commit()
+        return rows
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM dedup_keys")
+            self.conn.execute("DELETE FROM dedup_names")
+            self.conn.execute("DELETE FROM indexed_sources")
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def open_dedup_index(index_path, filepath=None, update_callback=print, country=None):
+    """Opens the index and, the first time an existing output file is seen, imports its rows.
+
+    An index built with older key normalization is rebuilt from the files its rows came from.
+    """
+    index = DedupIndex(index_path)
+    if index.outdated:
+        sources = [source for source in index.sources() if os.path.exists(source)]
+        update_callback(f"-> Dedup index uses an older key format; re-indexing {len(sources)} lead files (one-time)...")
+        index.clear()
+        for source in sources:
+            try: index.import_file(source, country)
+            except Exception as e: update_callback(f"-> Could not re-index '{source}'. Error: {e}")
+    if filepath and os.path.exists(filepath) and os.path.getsize(filepath) > 0 and not index.is_indexed(filepath):
+        update_callback(f"-> Indexing existing leads from '{os.path.basename(filepath)}' (one-time)...")
+        rows = index.import_file(filepath, country)
+        update_callback(f"-> Indexed {rows} rows.")
+    return index
+
+def rebuild_index(index_path, lead_paths, update_callback=print, country=None):
+    """Rebuilds the index from scratch out of existing lead files."""
+    index = DedupIndex(index_path)
+    index.clear()
+    for filepath in lead_paths:
+        try:
+            rows = index.import_file(filepath, country)
+            update_callback(f"-> {filepath}: {rows} rows indexed.")
+        except Exception as e:
+            update_callback(f"-> Could not index '{filepath}'. Error: {e}")
+    update_callback(f"-> Index '{index_path}' now holds {len(index)} unique addresses.")
+    index.close()
+
+# --- BATCH PASS ---
+
+def dedupe_file(input_path, output_path, mode='merge', country=None, threshold=NAME_SIMILARITY, update_callback=print):
+    """Finds exact and near-duplicate rows in an existing lead file in one streaming pass.
+
+    mode 'merge' writes one row per business, filling its empty fields from the duplicates; 'flag' keeps
+    every row and adds a 'Duplicate Of' column. Index and kept rows live in temporary SQLite files, so
+    memory stays flat for very large inputs. The output is written to a temporary file next to it and
+    replaces any existing output only once complete.
+    """
+    if os.path.realpath(input_path) == os.path.realpath(output_path):
+        raise ValueError("The output file must be different from the input file.")
+    stem, extension = os.path.splitext(os.path.basename(output_path))
+    partial_path = os.path.join(os.path.dirname(os.path.abspath(output_path)), f".{stem}.partial{extension}")
+    if os.path.exists(partial_path): os.remove(partial_path)
+    with tempfile.TemporaryDirectory() as workdir:
+        index = DedupIndex(os.path.join(workdir, "index.db"), threshold)
+        kept = sqlite3.connect(os.path.join(workdir, "rows.db"))
+        kept.execute("CREATE TABLE rows (id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+        headers, sink, total, duplicates = None, None, 0, 0
+        try:
+            for total, row in enumerate(read_rows(input_path), 1):
+                if headers is None:
+                    headers = list(row)
+                    if mode == 'flag': sink = open_sink(partial_path, headers + ["Duplicate Of"], flush_rows=1000)
+                fingerprint = LeadFingerprint(row, country=country)
+                match = index.match(fingerprint)
+                if match:
+                    duplicates += 1
+                    if mode == 'merge':
+                        original = json.loads(kept.execute("SELECT data FROM rows WHERE id = ?", (int(match.source),)).fetchone()[0])
+                        merged = {header: value if not _missing(value) else row.get(header, value) for header, value in original.items()}
+                        if merged != original:
+                            kept.execute("UPDATE rows SET data = ? WHERE id = ?", (json.dumps(merged), int(match.source)))
+                            # Fields filled in from the duplicate (e.g. its phone) become keys later rows can match on.
+                            index.add([LeadFingerprint(merged, country=country)], match.source, commit=False)
+                else:
+                    index.add([fingerprint], str(total), commit=False)
+                    if mode == 'merge': kept.execute("INSERT INTO rows (id, data) VALUES (?, ?)", (total, json.dumps(row)))
+                if sink: sink.writerow({**row, "Duplicate Of": f"row {match.source} ({match.reason})" if match else ""})
+                if total % 50000 == 0: update_callback(f"-> {total} rows checked, {duplicates} duplicates so far...")
+            if mode == 'merge' and headers:
+                with open_sink(partial_path, headers, flush_rows=1000) as merged_sink:
+                    for (data,) in kept.execute("SELECT data FROM rows ORDER BY id"): merged_sink.writerow(json.loads(data))
+            if sink:
+                sink.close()
+                sink = None
+            if os.path.exists(partial_path): os.replace(partial_path, output_path)
+        finally:
+            if sink: sink.close()
+            kept.close()
+            index.close()
+            if os.path.exists(partial_path): os.remove(partial_path)
+    update_callback(f"-> {total} rows checked: {duplicates} duplicates {'merged' if mode == 'merge' else 'flagged'}, {total - duplicates} unique.")
+    return total, duplicates
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the persistent lead dedup index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild the index from existing lead files (CSV, JSONL, SQLite or Parquet).")
+    rebuild_parser.add_argument("index_path")
+    rebuild_parser.add_argument("lead_paths", nargs="+")
+    rebuild_parser.add_argument("--country", help="Country used to put phone numbers without a country code into E.164 form.")
+    dedupe_parser = subparsers.add_parser("dedupe", help="Merge or flag exact and near-duplicate rows of a lead file into a new file.")
+    dedupe_parser.add_argument("input_path")
+    dedupe_parser.add_argument("output_path")
+    dedupe_parser.add_argument("--mode", choices=['merge', 'flag'], default='merge')
+    dedupe_parser.add_argument("--country", help="Country used to put phone numbers without a country code into E.164 form.")
+    dedupe_parser.add_argument("--threshold", type=float, default=NAME_SIMILARITY, help="Name similarity (0-1) that counts as the same business in one postal area.")
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        rebuild_index(args.index_path, args.lead_paths, country=args.country)
+    elif args.command == "dedupe":
+        dedupe_file(args.input_path, args.output_path, args.mode, args.country, args.threshold)
@@ -0,0 +1,208 @@
+# enrichment.py (Background website crawl that adds emails and social links to each lead)
+
+import re, json, time, sqlite3, threading, http.client
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit, urljoin
+
+ENRICHMENT_HEADERS = ["Emails", "Social Links"]
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+MAX_BODY_BYTES = 1_000_000
+CONTACT_LINK_RE = re.compile(r'<a\b[^>]*href=["\']([^"\'#]+)["\'][^>]*>(.*?)</a>', re.I | re.S)
+CONTACT_WORDS_RE = re.compile(r'contact|about|impressum|kontakt|get-in-touch', re.I)
+EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+EMAIL_IGNORE_RE = re.compile(r'\.(png|jpe?g|gif|svg|webp)$|@(example\.|sentry\.|.*wixpress\.com)', re.I)
+SOCIAL_RE = re.compile(r'https?://(?:www\.|[a-z]{2}\.)?(?:facebook\.com|instagram\.com|linkedin\.com|twitter\.com|x\.com|youtube\.com|tiktok\.com)/[^\s"\'<>?#]+', re.I)
+SOCIAL_IGNORE_RE = re.compile(r'sharer|/share|/intent/|/plugins/|/dialog/|/embed', re.I)
+FALLBACK_CONTACT_PATHS = ("/contact", "/contact-us")
+
+# --- PAGE PARSING ---
+
+def find_emails(html):
+    emails = set(re.findall(r'mailto:([^"\'?<>\s]+)', html, re.I)) | set(EMAIL_RE.findall(html))
+    return sorted({email.lower() for email in emails if EMAIL_RE.fullmatch(email) and not EMAIL_IGNORE_RE.search(email)})
+
+def find_social_links(html):
+    return sorted({link.rstrip('/') for link in SOCIAL_RE.findall(html) if not SOCIAL_IGNORE_RE.search(link)})
+
+def find_contact_links(html, page_url, limit):
+    """Same-site links whose URL or text looks like a contact/about page."""
+    host = urlsplit(page_url).netloc
+    links = []
+    for href, text in CONTACT_LINK_RE.findall(html):
+        url = urljoin(page_url, href.strip())
+        if urlsplit(url).netloc != host or url in links or not CONTACT_WORDS_RE.search(href + " " + text): continue
+        links.append(url)
+        if len(links) >= limit: break
+    return links
+
+def normalize_website(website):
+    if not website or website == "Not Found": return None
+    return website if re.match(r'https?://', website, re.I) else "http://" + website
+
+# --- HTTP ---
+
+class ConnectionPool:
+    """Keep-alive http.client connections, one per (thread, scheme, host), so repeat requests to a site skip the TCP/TLS handshake."""
+
+    def __init__(self, timeout=10):
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def get(self, url, max_redirects=3):
+        """Returns (final_url, status, body_text). Follows redirects and retries once on a dropped keep-alive connection."""
+        for _ in range(max_redirects + 1):
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            for attempt in range(2):
+                conn = self._connection(parts.scheme, parts.netloc)
+                try:
+                    conn.request("GET", path, headers={'User-Agent': USER_AGENT, 'Accept': 'text/html,*/*;q=0.8', 'Connection': 'keep-alive'})
+                    response = conn.getresponse()
+                    body = response.read(MAX_BODY_BYTES)
+                    if response.will_close or len(body) >= MAX_BODY_BYTES: self._drop(parts.scheme, parts.netloc)
+                    break
+                except (http.client.HTTPException, OSError):
+                    self._drop(parts.scheme, parts.netloc)
+                    if attempt: raise
+            location = response.getheader('Location')
+            if response.status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            charset = response.headers.get_content_charset() or 'utf-8'
+            return url, response.status, body.decode(charset, errors='replace')
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+
+    def _connection(self, scheme, netloc):
+        connections = self.local.__dict__.setdefault('connections', {})
+        key = (scheme, netloc)
+        if key not in connections:
+            connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            connections[key] = connection_class(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _drop(self, scheme, netloc):
+        conn = self.local.__dict__.get('connections', {}).pop((scheme, netloc), None)
+        if conn: conn.close()
+
+class DomainRateLimiter:
+    """Spaces requests to the same host at least `interval` seconds apart across all threads."""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, 0.0))
+            self.next_slot[host] = slot + self.interval
+        if slot > now: time.sleep(slot - now)
+
+# --- CACHE ---
+
+class UrlCache:
+    """SQLite cache of what each fetched page yielded, so re-runs and shared websites are not fetched again."""
+
+    def __init__(self, path, max_age_days=30):
+        self.max_age = max_age_days * 86400
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS url_cache (url TEXT PRIMARY KEY, status INTEGER, result TEXT NOT NULL, fetched REAL NOT NULL)")
+        self.conn.commit()
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute("SELECT result FROM url_cache WHERE url = ? AND fetched >= ?", (url, time.time() - self.max_age)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, url, status, result):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO url_cache (url, status, result, fetched) VALUES (?, ?, ?, ?)", (url, status, json.dumps(result), time.time()))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock: self.conn.close()
+
+# --- ENRICHER ---
+
+class WebsiteEnricher:
+    """Fetches each lead's website plus a few contact pages on a thread pool and fills ENRICHMENT_HEADERS.
+
+    submit() returns immediately; the finished lead is handed to the callback from a pool thread, so the
+    browser loop never waits on a slow website. drain() blocks until every submitted lead is done.
+    """
+
+    def __init__(self, cache_path=None, workers=8, domain_interval=1.0, timeout=10, max_pages=3, update_callback=print, metrics=None):
+        self.pool = ConnectionPool(timeout)
+        self.limiter = DomainRateLimiter(domain_interval)
+        self.cache = UrlCache(cache_path) if cache_path else None
+        self.max_pages = max(1, int(max_pages))
+        self.update_callback = update_callback
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="enrich")
+        self.futures = set()
+        self.lock = threading.Lock()
+        self.pages_fetched = 0
+        self.cache_hits = 0
+
+    def submit(self, lead_data, callback):
+        future = self.executor.submit(self._run, lead_data, callback)
+        with self.lock: self.futures.add(future)
+        future.add_done_callback(self._forget)
+
+    def drain(self):
+        with self.lock: pending = list(self.futures)
+        wait(pending)
+
+    def close(self):
+        self.drain()
+        self.executor.shutdown()
+        if self.cache: self.cache.close()
+
+    def _forget(self, future):
+        with self.lock: self.futures.discard(future)
+
+    def _run(self, lead_data, callback):
+        started = time.perf_counter()
+        try:
+            emails, socials = self.enrich(lead_data.get("Website URL"))
+        except Exception as e:
+            self.update_callback(f"  -> Enrichment failed for {lead_data.get('Business Name', 'N/A')}: {e}")
+            emails, socials = [], []
+        if self.metrics: self.metrics.record_stage('enrich', time.perf_counter() - started)
+        callback({**lead_data, "Emails": "; ".join(emails) or "Not Found", "Social Links": "; ".join(socials) or "Not Found"})
+
+    def enrich(self, website):
+        """Returns (emails, social_links) found on the homepage and its likely contact pages."""
+        homepage = normalize_website(website)
+        if not homepage: return [], []
+        home = self.fetch_page(homepage)
+        emails, socials = set(home['emails']), set(home['socials'])
+        contact_pages = home['contact_links'] or ([urljoin(home['url'], path) for path in FALLBACK_CONTACT_PATHS] if home['status'] == 200 else [])
+        for url in contact_pages[:self.max_pages - 1]:
+            if emails: break
+            page = self.fetch_page(url)
+            emails.update(page['emails'])
+            socials.update(page['socials'])
+        return sorted(emails), sorted(socials)
+
+    def fetch_page(self, url):
+        cached = self.cache.get(url) if self.cache else None
+        if cached is not None:
+            with self.lock: self.cache_hits += 1
+            return cached
+        self.limiter.wait(urlsplit(url).netloc.lower())
+        try:
+            final_url, status, html = self.pool.get(url)
+        except Exception:
+            final_url, status, html = url, 0, ""
+        with self.lock: self.pages_fetched += 1
+        ok = status == 200
+        result = {'url': final_url, 'status': status, 'emails': find_emails(html) if ok else [], 'socials': find_social_links(html) if ok else [],
+                  'contact_links': find_contact_links(html, final_url, self.max_pages - 1) if ok else []}
+        # Server errors, rate limiting and network failures are transient, so they are retried on the next run instead of cached.
+        if self.cache and (200 <= status < 300 or 400 <= status < 500 and status != 429): self.cache.put(url, status, result)
+        return result
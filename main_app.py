@@ -2,6 +2,8 @@
 
 import customtkinter
 import threading
+import queue
+import time
 import os
 import sys # <-- New import needed for the path helper
 import math
@@ -10,7 +12,7 @@ import webbrowser
 from urllib import request
 from tkinter import filedialog
 from PIL import Image, ImageTk
-from scraper_engine import run_scraper, load_processed_addresses
+# scraper_engine (Selenium), dedup_index and output_sinks are imported on first use so the window appears immediately.
 
 # --- NEW: Helper function to find bundled assets ---
 def resource_path(relative_path):
@@ -23,6 +25,23 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
+# --- Dedup index shared by every lead file in an output folder ---
+DEDUP_INDEX_FILENAME = "dedup_index.db"
+
+# --- Log pump: the textbox keeps a bounded ring of lines, the full log is streamed to a file ---
+LOG_PUMP_INTERVAL_MS = 100
+LOG_BATCH_LIMIT = 500
+MAX_LOG_LINES = 1000
+
+# --- Pre-launch a (headless) browser at startup and keep it warm between runs ---
+PREWARM_BROWSER_ON_START = True
+
+# --- On close, wait this long for a running scrape to flush its output, save its checkpoint and quit Chrome ---
+CLOSE_TIMEOUT_S = 30
+
+# --- Orbit animation frame interval (~25 fps); the orbit is paused entirely for headless runs ---
+ANIMATION_FRAME_MS = 40
+
 # --- Version Number for the entire application ---
 APP_VERSION = "1.0.2"
 
@@ -49,7 +68,7 @@ class App(customtkinter.CTk):
         # --- Sidebar Frame for Controls ---
         self.sidebar_frame = customtkinter.CTkFrame(self, width=200, corner_radius=0)
         self.sidebar_frame.grid(row=0, column=0, rowspan=2, sticky="nsew")
-        self.sidebar_frame.grid_rowconfigure(10, weight=1)
+        self.sidebar_frame.grid_rowconfigure(16, weight=1)
 
         self.logo_label = customtkinter.CTkLabel(self.sidebar_frame, text="Scraper Controls", font=customtkinter.CTkFont(size=20, weight="bold"))
         self.logo_label.grid(row=0, column=0, padx=20, pady=(20, 10))
@@ -63,26 +82,39 @@ class App(customtkinter.CTk):
         self.country_entry.grid(row=3, column=0, padx=20, pady=10)
         self.leads_entry = customtkinter.CTkEntry(self.sidebar_frame, placeholder_text="Number of Leads")
         self.leads_entry.grid(row=4, column=0, padx=20, pady=10)
+        self.workers_entry = customtkinter.CTkEntry(self.sidebar_frame, placeholder_text="Browser Workers (default 1)")
+        self.workers_entry.grid(row=5, column=0, padx=20, pady=10)
         self.folder_path_label = customtkinter.CTkLabel(self.sidebar_frame, text="Output Folder Path:", anchor="w")
-        self.folder_path_label.grid(row=5, column=0, padx=20, pady=(10, 0))
+        self.folder_path_label.grid(row=6, column=0, padx=20, pady=(10, 0))
         self.folder_path_frame = customtkinter.CTkFrame(self.sidebar_frame)
-        self.folder_path_frame.grid(row=6, column=0, padx=20, pady=(0, 10), sticky="ew")
+        self.folder_path_frame.grid(row=7, column=0, padx=20, pady=(0, 10), sticky="ew")
         self.folder_path_frame.grid_columnconfigure(0, weight=1)
         self.folder_path_entry = customtkinter.CTkEntry(self.folder_path_frame, placeholder_text="e.g., C:/Users/YourUser/Desktop")
         self.folder_path_entry.grid(row=0, column=0, sticky="ew")
         self.folder_path_entry.insert(0, os.path.join(os.getcwd(), "scraped_leads"))
         self.browse_button = customtkinter.CTkButton(self.folder_path_frame, text="...", width=30, command=self.browse_folder)
         self.browse_button.grid(row=0, column=1, padx=(5, 0))
-        self.filename_entry = customtkinter.CTkEntry(self.sidebar_frame, placeholder_text="Output Filename (e.g., leads.csv)")
-        self.filename_entry.grid(row=7, column=0, padx=20, pady=10)
+        self.filename_entry = customtkinter.CTkEntry(self.sidebar_frame, placeholder_text="Output File (.csv/.jsonl/.db/.parquet)")
+        self.filename_entry.grid(row=8, column=0, padx=20, pady=10)
         
         # --- Buttons & Options ---
         self.start_button = customtkinter.CTkButton(self.sidebar_frame, text="Start Scraping", command=self.start_scraping_thread)
-        self.start_button.grid(row=8, column=0, padx=20, pady=10)
+        self.start_button.grid(row=9, column=0, padx=20, pady=10)
         self.stop_button = customtkinter.CTkButton(self.sidebar_frame, text="Stop Scraper", state="disabled", command=self.stop_scraping)
-        self.stop_button.grid(row=9, column=0, padx=20, pady=10)
-        self.headless_checkbox = customtkinter.CTkCheckBox(self.sidebar_frame, text="Run Headless (no browser)")
-        self.headless_checkbox.grid(row=10, column=0, padx=20, pady=(10, 20), sticky="w")
+        self.stop_button.grid(row=10, column=0, padx=20, pady=10)
+        self.headless_checkbox = customtkinter.CTkCheckBox(self.sidebar_frame, text="Run Headless (no browser)", command=self.prewarm_browser)
+        self.headless_checkbox.grid(row=11, column=0, padx=20, pady=(10, 5), sticky="w")
+        self.direct_nav_checkbox = customtkinter.CTkCheckBox(self.sidebar_frame, text="Open Listings Directly (faster)")
+        self.direct_nav_checkbox.grid(row=12, column=0, padx=20, pady=5, sticky="w")
+        self.warm_browser_checkbox = customtkinter.CTkCheckBox(self.sidebar_frame, text="Keep Browser Warm", command=self.toggle_warm_browser)
+        self.warm_browser_checkbox.grid(row=13, column=0, padx=20, pady=5, sticky="w")
+        self.lean_checkbox = customtkinter.CTkCheckBox(self.sidebar_frame, text="Lean Browsing (block images/tiles)", command=self.prewarm_browser)
+        self.lean_checkbox.grid(row=14, column=0, padx=20, pady=5, sticky="w")
+        self.tiled_checkbox = customtkinter.CTkCheckBox(self.sidebar_frame, text="Tiled Search (large cities)")
+        self.tiled_checkbox.grid(row=15, column=0, padx=20, pady=5, sticky="w")
+        self.enrich_checkbox = customtkinter.CTkCheckBox(self.sidebar_frame, text="Find Emails on Websites")
+        self.enrich_checkbox.grid(row=16, column=0, padx=20, pady=(5, 20), sticky="w")
+        if PREWARM_BROWSER_ON_START: self.warm_browser_checkbox.select()
 
         # --- Main Content Area (Animation + Log) ---
         self.main_frame = customtkinter.CTkFrame(self, corner_radius=0, fg_color="transparent")
@@ -94,9 +126,18 @@ class App(customtkinter.CTk):
         self.animation_canvas = customtkinter.CTkCanvas(self.main_frame, bg="#2B2B2B", highlightthickness=0)
         self.animation_canvas.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="nsew")
 
+        # --- Live Metrics Summary ---
+        self.metrics_label = customtkinter.CTkLabel(self.main_frame, text="", anchor="w")
+        self.metrics_label.grid(row=1, column=0, padx=20, pady=0, sticky="ew")
+
         # --- Log Textbox ---
         self.log_textbox = customtkinter.CTkTextbox(self.main_frame, height=150)
-        self.log_textbox.grid(row=1, column=0, padx=20, pady=(10, 20), sticky="nsew")
+        self.log_textbox.grid(row=2, column=0, padx=20, pady=(10, 20), sticky="nsew")
+
+        # --- Log Pump (worker threads enqueue, the Tk main loop drains) ---
+        self.log_queue = queue.Queue()
+        self.log_file = None
+        self.after(LOG_PUMP_INTERVAL_MS, self.drain_log_queue)
 
         # --- Animation & Scraper Control Variables ---
         self.animation_state = "idle"
@@ -106,81 +147,138 @@ class App(customtkinter.CTk):
         
         self.scraper_thread = None
         self.stop_event = threading.Event()
+        self.driver_pool = None
+        self.driver_pool_lock = threading.Lock()
+        self.close_deadline = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(500, self.prewarm_browser)
 
         # --- Start the update check in a separate thread on launch ---
         threading.Thread(target=self.check_for_updates, daemon=True).start()
 
     def setup_animation(self):
         """Loads images using the resource_path helper function."""
+        self.image_cache = {}
+        self.animation_layout = None
+        self.animation_job = None
+        self.orbit_enabled = True
         try:
             # --- UPDATED: Use resource_path() for all images ---
             self.earth_pil_image = Image.open(resource_path("earth.png"))
             self.robot_orbit_pil_image = Image.open(resource_path("robot.png"))
             self.robot_idle_pil_image = Image.open(resource_path("robot_idle.png"))
             self.robot_success_pil_image = Image.open(resource_path("robot_success.png"))
-            
-            self.earth_tk_image = None
-            self.robot_orbit_tk_image = None
-            self.robot_idle_tk_image = None
-            self.robot_success_tk_image = None
 
             self.earth_id = self.animation_canvas.create_image(0, 0, anchor="center", state='hidden')
             self.robot_orbit_id = self.animation_canvas.create_image(0, 0, anchor="center", state='hidden')
             self.robot_idle_id = self.animation_canvas.create_image(0, 0, anchor="center", state='hidden')
             self.robot_success_id = self.animation_canvas.create_image(0, 0, anchor="center", state='hidden')
-            
+            self.animation_canvas.bind("<Configure>", lambda event: self.animate())
+
             self.update_log("Animation assets loaded successfully.")
         except Exception as e:
             self.update_log(f"Error loading animation assets: {e}")
 
-    def animate(self):
-        """The main animation loop that resizes, positions, and updates based on state."""
-        canvas_width = self.animation_canvas.winfo_width()
-        canvas_height = self.animation_canvas.winfo_height()
+    def scaled_image(self, pil_image, size):
+        """Returns a PhotoImage of pil_image scaled to size x size, resampling only the first time."""
+        key = (id(pil_image), size)
+        if key not in self.image_cache:
+            self.image_cache[key] = ImageTk.PhotoImage(pil_image.resize((size, size), Image.Resampling.LANCZOS))
+        return self.image_cache[key]
+
+    def apply_animation_layout(self, canvas_width, canvas_height):
+        """Sets images and static positions for the current state. Only runs when the state or canvas size changes."""
         center_x = canvas_width / 2
         center_y = canvas_height / 2
-
-        if canvas_width < 50 or canvas_height < 50:
-            self.after(100, self.animate)
-            return
-
-        self.animation_canvas.itemconfig(self.earth_id, state='hidden')
-        self.animation_canvas.itemconfig(self.robot_orbit_id, state='hidden')
-        self.animation_canvas.itemconfig(self.robot_idle_id, state='hidden')
-        self.animation_canvas.itemconfig(self.robot_success_id, state='hidden')
+        for item_id in (self.earth_id, self.robot_orbit_id, self.robot_idle_id, self.robot_success_id):
+            self.animation_canvas.itemconfig(item_id, state='hidden')
 
         if self.animation_state == 'idle':
             earth_size = int(canvas_height * 0.4)
             robot_size = int(canvas_height * 0.3)
-            self.earth_tk_image = ImageTk.PhotoImage(self.earth_pil_image.resize((earth_size, earth_size), Image.Resampling.LANCZOS))
-            self.robot_idle_tk_image = ImageTk.PhotoImage(self.robot_idle_pil_image.resize((robot_size, robot_size), Image.Resampling.LANCZOS))
-            self.animation_canvas.itemconfig(self.earth_id, image=self.earth_tk_image, state='normal')
-            self.animation_canvas.itemconfig(self.robot_idle_id, image=self.robot_idle_tk_image, state='normal')
+            self.animation_canvas.itemconfig(self.earth_id, image=self.scaled_image(self.earth_pil_image, earth_size), state='normal')
+            self.animation_canvas.itemconfig(self.robot_idle_id, image=self.scaled_image(self.robot_idle_pil_image, robot_size), state='normal')
             self.animation_canvas.coords(self.earth_id, center_x - (earth_size * 0.6), center_y)
             self.animation_canvas.coords(self.robot_idle_id, center_x + (earth_size * 0.7), center_y)
 
         elif self.animation_state == 'running':
             earth_size = int(canvas_height * 0.4)
-            robot_size = int(canvas_height * 0.25)
-            self.earth_tk_image = ImageTk.PhotoImage(self.earth_pil_image.resize((earth_size, earth_size), Image.Resampling.LANCZOS))
-            self.robot_orbit_tk_image = ImageTk.PhotoImage(self.robot_orbit_pil_image.resize((robot_size, robot_size), Image.Resampling.LANCZOS))
-            self.animation_canvas.itemconfig(self.earth_id, image=self.earth_tk_image, state='normal')
-            self.animation_canvas.itemconfig(self.robot_orbit_id, image=self.robot_orbit_tk_image, state='normal')
+            self.orbit_robot_size = int(canvas_height * 0.25)
+            self.animation_canvas.itemconfig(self.earth_id, image=self.scaled_image(self.earth_pil_image, earth_size), state='normal')
+            self.animation_canvas.itemconfig(self.robot_orbit_id, image=self.scaled_image(self.robot_orbit_pil_image, self.orbit_robot_size), state='normal')
             self.animation_canvas.coords(self.earth_id, center_x, center_y)
-            radius_x = (canvas_width / 2) - (robot_size)
-            radius_y = (canvas_height / 2) - (robot_size)
-            robot_x = center_x + radius_x * math.cos(self.angle)
-            robot_y = center_y + radius_y * math.sin(self.angle)
-            self.animation_canvas.coords(self.robot_orbit_id, robot_x, robot_y)
-            self.angle += 0.02
-            self.after(33, self.animate)
 
         elif self.animation_state == 'finished':
             robot_size = int(canvas_height * 0.5)
-            self.robot_success_tk_image = ImageTk.PhotoImage(self.robot_success_pil_image.resize((robot_size, robot_size), Image.Resampling.LANCZOS))
-            self.animation_canvas.itemconfig(self.robot_success_id, image=self.robot_success_tk_image, state='normal')
+            self.animation_canvas.itemconfig(self.robot_success_id, image=self.scaled_image(self.robot_success_pil_image, robot_size), state='normal')
             self.animation_canvas.coords(self.robot_success_id, center_x, center_y)
-            
+
+    def animate(self):
+        """The main animation loop. Scaled images are cached per canvas size, so the running loop only moves the robot."""
+        if self.animation_job:
+            self.after_cancel(self.animation_job)
+            self.animation_job = None
+        canvas_width = self.animation_canvas.winfo_width()
+        canvas_height = self.animation_canvas.winfo_height()
+
+        if canvas_width < 50 or canvas_height < 50:
+            self.animation_job = self.after(100, self.animate)
+            return
+
+        layout = (self.animation_state, canvas_width, canvas_height)
+        if layout != self.animation_layout:
+            if self.animation_layout and self.animation_layout[1:] != layout[1:]:
+                self.image_cache.clear()
+            self.apply_animation_layout(canvas_width, canvas_height)
+            self.animation_layout = layout
+
+        if self.animation_state == 'running':
+            radius_x = (canvas_width / 2) - self.orbit_robot_size
+            radius_y = (canvas_height / 2) - self.orbit_robot_size
+            robot_x = canvas_width / 2 + radius_x * math.cos(self.angle)
+            robot_y = canvas_height / 2 + radius_y * math.sin(self.angle)
+            self.animation_canvas.coords(self.robot_orbit_id, robot_x, robot_y)
+            if self.orbit_enabled:
+                self.angle += 0.02 * ANIMATION_FRAME_MS / 33
+                self.animation_job = self.after(ANIMATION_FRAME_MS, self.animate)
+
+    def get_driver_pool(self):
+        with self.driver_pool_lock:
+            if self.driver_pool is None:
+                from scraper_engine import WarmDriverPool
+                self.driver_pool = WarmDriverPool()
+            return self.driver_pool
+
+    def prewarm_browser(self):
+        """Launches the warm browser in the background (Selenium is imported there, off the UI thread).
+        Only headless browsers are pre-launched, so no empty Chrome window appears before a run."""
+        if not self.warm_browser_checkbox.get() or not self.headless_checkbox.get(): return
+        if self.scraper_thread and self.scraper_thread.is_alive(): return
+        params = {'headless': self.headless_checkbox.get(), 'browsing_profile': 'lean' if self.lean_checkbox.get() else 'default'}
+        threading.Thread(target=lambda: self.get_driver_pool().prewarm(params, self.update_log), daemon=True).start()
+
+    def toggle_warm_browser(self):
+        if self.warm_browser_checkbox.get():
+            self.prewarm_browser()
+        elif self.driver_pool:
+            threading.Thread(target=self.driver_pool.close, daemon=True).start()
+
+    def on_close(self):
+        """Stops a running scrape and only destroys the window once it has shut down (or CLOSE_TIMEOUT_S passed)."""
+        self.stop_event.set()
+        if self.close_deadline: return
+        self.close_deadline = time.monotonic() + CLOSE_TIMEOUT_S
+        if self.scraper_thread and self.scraper_thread.is_alive():
+            self.update_log("--- CLOSING: waiting for the run to save its progress ---")
+        self.close_when_stopped()
+
+    def close_when_stopped(self):
+        if self.scraper_thread and self.scraper_thread.is_alive() and time.monotonic() < self.close_deadline:
+            self.after(200, self.close_when_stopped)
+            return
+        if self.driver_pool: self.driver_pool.close()
+        self.destroy()
+
     def browse_folder(self):
         folder_path = filedialog.askdirectory()
         if folder_path:
@@ -188,18 +286,78 @@ class App(customtkinter.CTk):
             self.folder_path_entry.insert(0, folder_path)
 
     def update_log(self, text):
-        self.log_textbox.insert("end", text + "\n")
+        """Thread-safe: queues a log line for the Tk main loop to display."""
+        self.log_queue.put(text)
+
+    def call_on_main(self, callback):
+        """Thread-safe: queues a UI update to run on the Tk main loop."""
+        self.log_queue.put(callback)
+
+    def drain_log_queue(self):
+        """Runs on the Tk main loop: inserts queued lines in one batch and trims the textbox to MAX_LOG_LINES."""
+        lines = []
+        try:
+            for _ in range(LOG_BATCH_LIMIT):
+                item = self.log_queue.get_nowait()
+                if callable(item):
+                    self.flush_log_lines(lines)
+                    lines = []
+                    item()
+                else:
+                    lines.append(item)
+        except queue.Empty:
+            pass
+        self.flush_log_lines(lines)
+        if self.log_file and not (self.scraper_thread and self.scraper_thread.is_alive()) and self.log_queue.empty():
+            self.log_file.close()
+            self.log_file = None
+        self.after(LOG_PUMP_INTERVAL_MS, self.drain_log_queue)
+
+    def flush_log_lines(self, lines):
+        if not lines: return
+        text = "\n".join(lines) + "\n"
+        if self.log_file: self.log_file.write(text)
+        self.log_textbox.insert("end", text)
+        line_count = int(self.log_textbox.index("end-1c").split(".")[0])
+        if line_count > MAX_LOG_LINES:
+            self.log_textbox.delete("1.0", f"{line_count - MAX_LOG_LINES + 1}.0")
         self.log_textbox.see("end")
-        self.update_idletasks()
+
+    def open_log_file(self):
+        """Streams the full log of a run to '<output filename>.log' next to the output file."""
+        output_dir, filename = self.folder_path_entry.get(), self.filename_entry.get()
+        if not output_dir or not filename: return
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            log_path = os.path.join(output_dir, os.path.splitext(filename)[0] + ".log")
+            self.log_file = open(log_path, 'a', encoding='utf-8', buffering=1)
+            self.log_file.write(f"\n===== Run started {time.strftime('%Y-%m-%d %H:%M:%S')} =====\n")
+            self.update_log(f"Full log: {log_path}")
+        except OSError as e:
+            self.update_log(f"Could not open log file: {e}")
 
     def start_scraping_thread(self):
         self.start_button.configure(state="disabled")
         self.stop_button.configure(state="normal")
         self.log_textbox.delete("1.0", "end")
+        self.metrics_label.configure(text="")
+        if self.log_file: self.log_file.close()
+        self.open_log_file()
         self.stop_event.clear()
         self.animation_state = 'running'
+        self.orbit_enabled = not self.headless_checkbox.get()
+        if not self.orbit_enabled:
+            self.update_log("-> Headless run: orbit animation paused to save CPU.")
         self.animate()
-        self.scraper_thread = threading.Thread(target=self.run_scraper_logic)
+        # Widgets are read here on the Tk main loop; the scraper thread only gets plain values.
+        form = {
+            'output_dir': self.folder_path_entry.get(), 'filename': self.filename_entry.get(),
+            'keyword': self.keyword_entry.get(), 'location': self.location_entry.get(), 'country': self.country_entry.get(),
+            'target_leads': self.leads_entry.get(), 'workers': self.workers_entry.get(), 'headless': self.headless_checkbox.get(),
+            'direct_nav': self.direct_nav_checkbox.get(), 'lean': self.lean_checkbox.get(), 'tiled': self.tiled_checkbox.get(),
+            'enrich': self.enrich_checkbox.get(), 'warm_browser': self.warm_browser_checkbox.get(),
+        }
+        self.scraper_thread = threading.Thread(target=self.run_scraper_logic, args=(form,))
         self.scraper_thread.daemon = True
         self.scraper_thread.start()
 
@@ -209,42 +367,66 @@ class App(customtkinter.CTk):
             self.stop_event.set()
             self.stop_button.configure(state="disabled")
 
-    def run_scraper_logic(self):
+    def run_scraper_logic(self, form):
+        """Runs on the scraper thread; `form` holds the widget values read on the main loop."""
+        dedup_index = None
         try:
-            output_dir = self.folder_path_entry.get()
-            filename = self.filename_entry.get()
+            from scraper_engine import run_scraper
+            from dedup_index import open_dedup_index
+            from output_sinks import SINK_EXTENSIONS
+            output_dir = form['output_dir']
+            filename = form['filename']
             if not output_dir or not filename:
                 self.update_log("ERROR: Output folder path and filename cannot be empty.")
-                self.animation_state = 'idle'
-                self.animate()
+                self.call_on_main(self.reset_animation)
                 return
-            if not filename.lower().endswith('.csv'):
+            if os.path.splitext(filename)[1].lower() not in SINK_EXTENSIONS:
                 filename += '.csv'
             os.makedirs(output_dir, exist_ok=True)
             filepath = os.path.join(output_dir, filename)
             params = {
-                'keyword': self.keyword_entry.get(),
-                'location': self.location_entry.get(),
-                'country': self.country_entry.get(),
-                'target_leads': int(self.leads_entry.get()),
-                'headless': self.headless_checkbox.get(),
+                'keyword': form['keyword'],
+                'location': form['location'],
+                'country': form['country'],
+                'target_leads': int(form['target_leads']),
+                'workers': int(form['workers'] or 1),
+                'headless': form['headless'],
+                'navigation_mode': 'direct' if form['direct_nav'] else 'click',
+                'browsing_profile': 'lean' if form['lean'] else 'default',
+                'search_mode': 'tiled' if form['tiled'] else 'single',
+                'enrich_websites': bool(form['enrich']),
                 'filepath': filepath,
                 'processed_addresses': set()
             }
             if os.path.exists(params['filepath']):
                 self.update_log(f"File exists. Will append new unique leads to: {params['filepath']}")
-                params['processed_addresses'] = load_processed_addresses(params['filepath'])
-                self.update_log(f"Loaded {len(params['processed_addresses'])} previously scraped addresses.")
+            dedup_index = open_dedup_index(os.path.join(output_dir, DEDUP_INDEX_FILENAME), filepath, self.update_log, params['country'])
+            params['dedup_index'] = dedup_index
+            if form['warm_browser']:
+                params['driver_pool'] = self.get_driver_pool()
+            output_stem = os.path.splitext(filepath)[0]
+            params['metrics_path'] = output_stem + ".metrics.jsonl"
+            if params['headless']: params['metrics_prometheus_path'] = output_stem + ".prom"
+            params['metrics_callback'] = lambda summary: self.call_on_main(lambda: self.metrics_label.configure(text=summary))
+            self.update_log(f"Dedup index holds {len(dedup_index)} previously scraped addresses.")
             run_scraper(params, self.update_log, self.stop_event)
         except ValueError:
-            self.update_log("ERROR: 'Number of Leads' must be a valid number.")
+            self.update_log("ERROR: 'Number of Leads' and 'Browser Workers' must be valid numbers.")
         except Exception as e:
             self.update_log(f"An unexpected error occurred: {e}")
         finally:
-            self.animation_state = 'finished'
-            self.animate()
-            self.start_button.configure(state="normal")
-            self.stop_button.configure(state="disabled")
+            if dedup_index: dedup_index.close()
+            self.call_on_main(self.finish_scraping)
+
+    def reset_animation(self):
+        self.animation_state = 'idle'
+        self.animate()
+
+    def finish_scraping(self):
+        self.animation_state = 'finished'
+        self.animate()
+        self.start_button.configure(state="normal")
+        self.stop_button.configure(state="disabled")
             
     def check_for_updates(self):
         """Checks for new releases on GitHub using the public API."""
@@ -256,7 +438,7 @@ class App(customtkinter.CTk):
             latest_version = data['tag_name']
             if latest_version.lstrip('v') > self.APP_VERSION:
                 self.update_log(f"New version found: {latest_version}")
-                self.prompt_for_update(data['html_url'])
+                self.call_on_main(lambda: self.prompt_for_update(data['html_url']))
             else:
                 self.update_log("You are running the latest version.")
         except Exception as e:
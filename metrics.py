@@ -0,0 +1,136 @@
+# metrics.py (Per-stage timings and run counters for the scraper hot path)
+
+import os, json, time, threading
+from contextlib import contextmanager
+
+STAGES = ('navigate', 'scroll', 'open', 'wait', 'extract', 'dedup', 'write', 'enrich')
+
+class ScrapeMetrics:
+    """Times each stage of a run and keeps counters (leads, duplicates, timeouts, errors).
+
+    Every stage timing is appended to `events_path` as a JSON line. Every `interval` seconds an
+    aggregate event is emitted too, the Prometheus text file at `prometheus_path` is rewritten and
+    `summary_callback` receives a one-line summary for live display.
+    """
+
+    def __init__(self, events_path=None, prometheus_path=None, summary_callback=None, interval=10.0, labels=None):
+        self.prometheus_path = prometheus_path
+        self.summary_callback = summary_callback
+        self.interval = interval
+        self.labels = labels or {}
+        self.lock = threading.Lock()
+        self.report_lock = threading.Lock()
+        self.report_error = None
+        self.events_file = open(events_path, 'a', encoding='utf-8') if events_path else None
+        self.started = time.time()
+        self.last_report = time.monotonic()
+        self.stage_totals = {stage: 0.0 for stage in STAGES}
+        self.stage_counts = {stage: 0 for stage in STAGES}
+        self.counters = {'leads': 0, 'duplicates': 0, 'timeouts': 0, 'errors': 0, 'scrolls': 0, 'empty_scrolls': 0, 'recycles': 0}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - started)
+
+    def record_stage(self, name, seconds):
+        with self.lock:
+            self.stage_totals[name] = self.stage_totals.get(name, 0.0) + seconds
+            self.stage_counts[name] = self.stage_counts.get(name, 0) + 1
+            self._emit({'type': 'stage', 'stage': name, 'seconds': round(seconds, 4)})
+        self.maybe_report()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+            self._emit({'type': 'count', 'counter': name, 'value': self.counters[name]})
+        self.maybe_report()
+
+    def snapshot(self):
+        with self.lock:
+            elapsed_minutes = max(time.time() - self.started, 1e-9) / 60
+            leads, duplicates = self.counters['leads'], self.counters['duplicates']
+            return {
+                'elapsed_s': round(elapsed_minutes * 60, 1),
+                'leads_per_min': round(leads / elapsed_minutes, 2),
+                'dup_rate': round(duplicates / (leads + duplicates), 3) if leads + duplicates else 0.0,
+                'counters': dict(self.counters),
+                'stage_avg_s': {stage: round(self.stage_totals[stage] / count, 3) for stage, count in self.stage_counts.items() if count},
+                'stage_total_s': {stage: round(total, 2) for stage, total in self.stage_totals.items() if self.stage_counts[stage]},
+            }
+
+    def summary_line(self, snapshot=None):
+        snapshot = snapshot or self.snapshot()
+        slowest = sorted(snapshot['stage_total_s'].items(), key=lambda item: -item[1])[:3]
+        stages = ", ".join(f"{stage} {total:.0f}s" for stage, total in slowest)
+        return (f"{snapshot['counters']['leads']} leads | {snapshot['leads_per_min']:.1f}/min | dup {snapshot['dup_rate']:.0%} | "
+                f"timeouts {snapshot['counters']['timeouts']} | time in: {stages or '-'}")
+
+    def maybe_report(self, force=False):
+        """Emits the aggregate at most once per interval. Reporting runs inside scraping stages, so its
+        errors are kept in `report_error` instead of being raised."""
+        with self.lock:
+            if not force and time.monotonic() - self.last_report < self.interval: return
+            self.last_report = time.monotonic()
+        with self.report_lock:
+            try:
+                snapshot = self.snapshot()
+                with self.lock:
+                    self._emit({'type': 'aggregate', **snapshot})
+                    if self.events_file: self.events_file.flush()
+                if self.prometheus_path: self.write_prometheus(snapshot)
+                if self.summary_callback: self.summary_callback(self.summary_line(snapshot))
+            except Exception as e:
+                self.report_error = e
+
+    def write_prometheus(self, snapshot):
+        labels = ",".join(f'{key}="{_escape_label(value)}"' for key, value in self.labels.items())
+        def series(name, value, extra=""):
+            label_text = ",".join(part for part in (labels, extra) if part)
+            return f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+
+        lines = ["# HELP gmaps_scraper_events_total Run counters (leads, duplicates, timeouts, errors, scrolls, browser recycles).",
+                 "# TYPE gmaps_scraper_events_total counter"]
+        lines += [series("gmaps_scraper_events_total", value, f'event="{name}"') for name, value in snapshot['counters'].items()]
+        lines += ["# HELP gmaps_scraper_stage_seconds Time spent per scraping stage.", "# TYPE gmaps_scraper_stage_seconds summary"]
+        with self.lock:
+            for stage, count in self.stage_counts.items():
+                if not count: continue
+                lines.append(series("gmaps_scraper_stage_seconds_sum", round(self.stage_totals[stage], 4), f'stage="{stage}"'))
+                lines.append(series("gmaps_scraper_stage_seconds_count", count, f'stage="{stage}"'))
+        lines += ["# HELP gmaps_scraper_leads_per_minute Leads written per minute since the run started.", "# TYPE gmaps_scraper_leads_per_minute gauge",
+                  series("gmaps_scraper_leads_per_minute", snapshot['leads_per_min']),
+                  "# HELP gmaps_scraper_duplicate_ratio Share of extracted listings that were duplicates.", "# TYPE gmaps_scraper_duplicate_ratio gauge",
+                  series("gmaps_scraper_duplicate_ratio", snapshot['dup_rate'])]
+        tmp_path = f"{self.prometheus_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.prometheus_path)
+
+    def close(self):
+        self.maybe_report(force=True)
+        with self.lock:
+            if self.events_file:
+                self.events_file.close()
+                self.events_file = None
+
+    def _emit(self, event):
+        # Caller holds self.lock.
+        if self.events_file:
+            self.events_file.write(json.dumps({'ts': round(time.time(), 3), **self.labels, **event}) + "\n")
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def load_stage_timings(events_path):
+    """Reads the per-stage durations back out of a JSON-lines metrics file."""
+    timings = {}
+    with open(events_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            event = json.loads(line)
+            if event.get('type') == 'stage':
+                timings.setdefault(event['stage'], []).append(event['seconds'])
+    return timings
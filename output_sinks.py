@@ -0,0 +1,214 @@
+# output_sinks.py (Batched lead writers for CSV, JSONL, SQLite and Parquet output)
+
+import os, csv, json, time, sqlite3
+
+def _require_pyarrow():
+    """pyarrow is optional and heavy, so it is only imported when Parquet is actually used."""
+    try:
+        import pyarrow, pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet output requires the 'pyarrow' package (pip install pyarrow).")
+    return pyarrow, pyarrow.parquet
+
+# --- BASE SINK ---
+
+class OutputSink:
+    """Buffers rows and writes them in batches.
+
+    Durability policy: pending rows are flushed every `flush_rows` rows or `flush_seconds` seconds,
+    whichever comes first, and on close. With `fsync=True` every flush is also forced to disk.
+    `durable` tells whether flushed rows are already in the output file; formats that only publish
+    the file on close keep it False until then.
+    """
+
+    durable = True
+
+    def __init__(self, filepath, headers, flush_rows=50, flush_seconds=5.0, fsync=False):
+        self.filepath = filepath
+        self.headers = headers
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_seconds = float(flush_seconds)
+        self.fsync = fsync
+        self.pending = []
+        self.last_flush = time.monotonic()
+        self.open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def writerow(self, row):
+        self.pending.append({header: row.get(header, "") for header in self.headers})
+        if len(self.pending) >= self.flush_rows: self.flush()
+        else: self.flush_if_due()
+
+    def flush_if_due(self):
+        if self.pending and time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.write_rows(self.pending)
+            self.pending = []
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.finish()
+
+    # Implemented by each format.
+    def open(self): raise NotImplementedError
+    def write_rows(self, rows): raise NotImplementedError
+    def finish(self): pass
+
+    @staticmethod
+    def read_rows(filepath):
+        raise NotImplementedError
+
+# --- FORMATS ---
+
+class CsvSink(OutputSink):
+    def open(self):
+        is_new_file = not os.path.exists(self.filepath) or os.path.getsize(self.filepath) == 0
+        if not is_new_file:
+            with open(self.filepath, 'r', newline='', encoding='utf-8-sig') as f:
+                existing_headers = next(csv.reader(f), [])
+            if existing_headers != self.headers:
+                raise ValueError(f"'{os.path.basename(self.filepath)}' has different columns ({len(existing_headers)} vs {len(self.headers)}); choose a new output file.")
+        self.file = open(self.filepath, 'a', newline='', encoding='utf-8-sig')
+        self.writer = csv.DictWriter(self.file, fieldnames=self.headers)
+        if is_new_file:
+            self.writer.writeheader()
+            self.file.flush()
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        if self.fsync: os.fsync(self.file.fileno())
+
+    def finish(self):
+        self.file.close()
+
+    @staticmethod
+    def read_rows(filepath):
+        with open(filepath, 'r', newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+
+class JsonlSink(OutputSink):
+    def open(self):
+        self.file = open(self.filepath, 'a', encoding='utf-8')
+
+    def write_rows(self, rows):
+        self.file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows))
+        self.file.flush()
+        if self.fsync: os.fsync(self.file.fileno())
+
+    def finish(self):
+        self.file.close()
+
+    @staticmethod
+    def read_rows(filepath):
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip(): yield json.loads(line)
+
+class SqliteSink(OutputSink):
+    TABLE = "leads"
+
+    def open(self):
+        self.conn = sqlite3.connect(self.filepath)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'NORMAL'}")
+        quoted = [f'"{header}"' for header in self.headers]
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {self.TABLE} ({', '.join(column + ' TEXT' for column in quoted)})")
+        existing_columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({self.TABLE})")}
+        for header in self.headers:
+            if header not in existing_columns: self.conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN "{header}" TEXT')
+        self.conn.commit()
+        self.insert_sql = f"INSERT INTO {self.TABLE} ({', '.join(quoted)}) VALUES ({', '.join('?' for _ in quoted)})"
+
+    def write_rows(self, rows):
+        self.conn.executemany(self.insert_sql, [[row[header] for header in self.headers] for row in rows])
+        self.conn.commit()
+
+    def finish(self):
+        self.conn.close()
+
+    @staticmethod
+    def read_rows(filepath):
+        conn = sqlite3.connect(filepath)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute(f"SELECT * FROM {SqliteSink.TABLE}"):
+                yield dict(row)
+        finally:
+            conn.close()
+
+class ParquetSink(OutputSink):
+    """Each flush becomes one row group. Parquet files cannot be appended to, so the run writes to a
+    temporary file seeded with the existing rows and replaces the original on close; rows of a run
+    that crashes before close are lost, so the sink only reports itself durable once closed."""
+
+    def open(self):
+        self.durable = False
+        pa, pq = self.pa, self.pq = _require_pyarrow()
+        self.schema = pa.schema([(header, pa.string()) for header in self.headers])
+        self.tmp_path = self.filepath + ".tmp"
+        self.file = open(self.tmp_path, 'wb')
+        self.writer = pq.ParquetWriter(self.file, self.schema)
+        if os.path.exists(self.filepath):
+            existing = pq.read_table(self.filepath)
+            for header in self.headers:
+                if header not in existing.column_names: existing = existing.append_column(header, pa.nulls(existing.num_rows, pa.string()))
+            self.writer.write_table(existing.select(self.headers).cast(self.schema))
+
+    def write_rows(self, rows):
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+        if self.fsync:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def finish(self):
+        self.writer.close()
+        self.file.close()
+        os.replace(self.tmp_path, self.filepath)
+        self.durable = True
+
+    @staticmethod
+    def read_rows(filepath):
+        pa, pq = _require_pyarrow()
+        yield from pq.read_table(filepath).to_pylist()
+
+# --- SELECTION ---
+
+SINKS = {
+    'csv': CsvSink,
+    'jsonl': JsonlSink,
+    'sqlite': SqliteSink,
+    'parquet': ParquetSink,
+}
+
+SINK_EXTENSIONS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.db': 'sqlite',
+    '.sqlite': 'sqlite',
+    '.parquet': 'parquet',
+}
+
+def sink_format(filepath, output_format=None):
+    """Picks the output format from an explicit name or the file extension (CSV by default)."""
+    if output_format:
+        if output_format not in SINKS:
+            raise ValueError(f"Unknown output format '{output_format}'. Choose from: {', '.join(SINKS)}.")
+        return output_format
+    return SINK_EXTENSIONS.get(os.path.splitext(filepath)[1].lower(), 'csv')
+
+def open_sink(filepath, headers, output_format=None, **policy):
+    return SINKS[sink_format(filepath, output_format)](filepath, headers, **policy)
+
+def read_rows(filepath, output_format=None):
+    """Iterates over the rows of an existing output file of any supported format."""
+    return SINKS[sink_format(filepath, output_format)].read_rows(filepath)
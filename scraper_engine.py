@@ -1,8 +1,15 @@
 # scraper_engine.py (Corrected Version)
 
-import time, re, os, csv, random
+import time, re, os, json, random, threading, queue
+from collections import deque
 from urllib.parse import urlparse
 from selenium import webdriver
+from dedup_index import LeadFingerprint, MemoryIndex, NAME_SIMILARITY, extract_place_id
+from output_sinks import open_sink
+from checkpoint import Checkpoint
+from metrics import ScrapeMetrics
+from enrichment import WebsiteEnricher, ENRICHMENT_HEADERS
+from tiling import TileScheduler, split_bounds, build_tile_url, geocode_bounds
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -14,27 +21,6 @@ from selenium.webdriver.common.keys import Keys
 
 # --- HELPER FUNCTIONS ---
 
-# --- FIXED: Added the missing load_processed_addresses function ---
-def load_processed_addresses(filepath):
-    """Loads previously scraped Full Business Addresses from a CSV to prevent duplicates."""
-    processed_addresses = set()
-    try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r', newline='', encoding='utf-8-sig') as f:
-                reader = csv.reader(f)
-                header = next(reader)
-                try:
-                    address_index = header.index('Full Business Address')
-                    for row in reader:
-                        if len(row) > address_index and row[address_index] and row[address_index] != 'Not Found':
-                            processed_addresses.add(row[address_index])
-                except ValueError:
-                    # This is not an error, the file might be new
-                    pass
-    except Exception as e:
-        print(f"-> Could not load previous file '{filepath}'. Error: {e}")
-    return processed_addresses
-
 def clean_url(url):
     if url and '?' in url: return url.split('?')[0]
     return url
@@ -43,58 +29,120 @@ def clean_text(text):
     if not text: return ""
     return re.sub(r'^[||]\s*', '', text).strip()
 
-def extract_business_details(driver):
-    details = {}
-    try: details["Business Name"] = driver.find_element(By.CSS_SELECTOR, "h1.DUwDvf, h1.fontHeadlineLarge").text
-    except NoSuchElementException: details["Business Name"] = "Not Found"
-    try:
-        review_container = driver.find_element(By.CSS_SELECTOR, "div.F7nice")
-        review_text = review_container.text
+# --- DETAIL EXTRACTION ---
+
+DETAIL_SELECTORS = {
+    "name": "h1.DUwDvf, h1.fontHeadlineLarge",
+    "reviews": "div.F7nice",
+    "pricing": "span.mgr77e",
+    "address": "[data-item-id='address']",
+    "website": "[data-item-id='authority']",
+    "phone": "[data-item-id^='phone:tel:']",
+    "hours": "[jsaction*='pane.openhours']",
+    "hours_text": "span.ZDu9vd",
+    "plus_code": "[data-item-id='oloc']",
+}
+
+# Collects every raw field of the detail pane in one execute_script round-trip.
+EXTRACT_DETAILS_JS = """
+const sel = arguments[0];
+const find = (s, root) => (root || document).querySelector(s);
+const text = (s) => { const el = find(s); return el ? el.innerText : null; };
+const hours = find(sel.hours);
+const hoursText = hours ? find(sel.hours_text, hours) : null;
+const website = find(sel.website);
+return {
+    name: text(sel.name),
+    reviews: text(sel.reviews),
+    pricing: text(sel.pricing),
+    address: text(sel.address),
+    website: website ? (website.href || website.getAttribute('href')) : null,
+    phone: text(sel.phone),
+    hours: hoursText ? hoursText.innerText : null,
+    plus_code: text(sel.plus_code),
+};
+"""
+
+def parse_business_details(raw):
+    """Builds the lead dict from the raw text/href of each detail field (None = element missing)."""
+    def found(key, transform=lambda value: value):
+        return transform(raw[key]) if raw.get(key) is not None else "Not Found"
+
+    details = {"Business Name": found("name")}
+    review_text = raw.get("reviews")
+    if review_text is not None:
         rating_match = re.search(r'(\d\.\d|\d)', review_text)
         details["Star Rating"] = rating_match.group(1) if rating_match else "N/A"
         reviews_match = re.search(r'\((\d{1,3}(,\d{3})*|[\d,]+)\)', review_text)
         details["Number of Google Reviews"] = reviews_match.group(1) if reviews_match else "0"
-    except NoSuchElementException:
+    else:
         details["Star Rating"], details["Number of Google Reviews"] = "N/A", "0"
-    try:
-        pricing_text = driver.find_element(By.CSS_SELECTOR, "span.mgr77e").text
-        details["Pricing"] = clean_text(pricing_text.replace('·', ''))
-    except NoSuchElementException: details["Pricing"] = "Not Found"
-    try:
-        address_text = driver.find_element(By.CSS_SELECTOR, "[data-item-id='address']").text
-        details["Full Business Address"] = clean_text(address_text)
-    except NoSuchElementException: details["Full Business Address"] = "Not Found"
-    try:
-        raw_url = driver.find_element(By.CSS_SELECTOR, "[data-item-id='authority']").get_attribute("href")
-        details["Website URL"] = clean_url(raw_url)
-    except NoSuchElementException: details["Website URL"] = "Not Found"
-    try:
-        phone_text = driver.find_element(By.CSS_SELECTOR, "[data-item-id^='phone:tel:']").text
-        details["Phone Number"] = clean_text(phone_text)
-    except NoSuchElementException: details["Phone Number"] = "Not Found"
-    try:
-        hours_container = driver.find_element(By.CSS_SELECTOR, "[jsaction*='pane.openhours']")
-        details["Business Hours"] = hours_container.find_element(By.CSS_SELECTOR, "span.ZDu9vd").text
-    except NoSuchElementException: details["Business Hours"] = "Not Found"
-    try:
-        plus_code_text = driver.find_element(By.CSS_SELECTOR, "[data-item-id='oloc']").text
-        details["Plus Code"] = clean_text(plus_code_text)
-    except NoSuchElementException: details["Plus Code"] = "Not Found"
+    details["Pricing"] = found("pricing", lambda value: clean_text(value.replace('·', '')))
+    details["Full Business Address"] = found("address", clean_text)
+    details["Website URL"] = found("website", clean_url)
+    details["Phone Number"] = found("phone", clean_text)
+    details["Business Hours"] = found("hours")
+    details["Plus Code"] = found("plus_code", clean_text)
     return details
 
-def run_scraper(params, update_callback, stop_event):
-    keyword, location, country = params['keyword'], params['location'], params['country']
-    target_leads, headless, filepath, processed_addresses = params['target_leads'], params['headless'], params['filepath'], params['processed_addresses']
-    
-    headers = [ "Business Name", "Star Rating", "Number of Google Reviews", "Pricing", "Full Business Address", "Business Hours", "Plus Code", "Phone Number", "Website URL" ]
-    delays = {'short': (2, 4), 'medium': (4, 7), 'long': (7, 12)} if target_leads > 50 else {'short': (1, 2.5), 'medium': (2.5, 4), 'long': (4, 7)}
-    
-    is_new_file = not os.path.exists(filepath) or os.path.getsize(filepath) == 0
-    if is_new_file:
-        with open(filepath, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
+def extract_business_details(driver):
+    """Element-by-element extraction: one WebDriver round-trip per field."""
+    def element_text(selector):
+        try: return driver.find_element(By.CSS_SELECTOR, selector).text
+        except NoSuchElementException: return None
+
+    raw = {key: element_text(DETAIL_SELECTORS[key]) for key in ("name", "reviews", "pricing", "address", "phone", "plus_code")}
+    try: raw["website"] = driver.find_element(By.CSS_SELECTOR, DETAIL_SELECTORS["website"]).get_attribute("href")
+    except NoSuchElementException: raw["website"] = None
+    try:
+        hours_container = driver.find_element(By.CSS_SELECTOR, DETAIL_SELECTORS["hours"])
+        raw["hours"] = hours_container.find_element(By.CSS_SELECTOR, DETAIL_SELECTORS["hours_text"]).text
+    except NoSuchElementException: raw["hours"] = None
+    return parse_business_details(raw)
+
+def extract_business_details_batched(driver):
+    """Batched extraction: every field is read by a single in-page script call."""
+    return parse_business_details(driver.execute_script(EXTRACT_DETAILS_JS, DETAIL_SELECTORS) or {})
+
+# Selectable through params['extraction_mode'] so both paths can be compared on the same pages.
+EXTRACTION_MODES = {
+    'elements': extract_business_details,
+    'batched': extract_business_details_batched,
+}
+
+# --- SESSION HELPERS ---
+
+HEADERS = [ "Business Name", "Star Rating", "Number of Google Reviews", "Pricing", "Full Business Address", "Business Hours", "Plus Code", "Phone Number", "Website URL" ]
+FEED_SELECTOR = 'div[role="feed"]'
+LISTING_LINK_SELECTOR = "a.hfpxzc"
+HEADER_SELECTOR = "h1.DUwDvf, h1.fontHeadlineLarge"
 
+# Reads the href and label of every loaded listing in one round-trip.
+HARVEST_LINKS_JS = """
+return Array.from(document.querySelectorAll(arguments[0])).map(a => [a.href, a.getAttribute('aria-label')]);
+"""
+
+# --- BROWSING PROFILES ---
+
+# URL patterns (Network.setBlockedURLs wildcards) blocked by the 'lean' profile, grouped by category.
+# extract_business_details only reads text and hrefs, so none of these are needed.
+LEAN_BLOCK_PATTERNS = {
+    'images': ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*googleusercontent.com/*", "*gstatic.com/images/*"],
+    'media': ["*.mp4", "*.webm", "*.mp3", "*.m4a", "*.ogg"],
+    'fonts': ["*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.gstatic.com/*", "*fonts.googleapis.com/*"],
+    'tiles': ["*/maps/vt?*", "*/maps/vt/*", "*/kh/v=*", "*khms*.google.com/*", "*streetviewpixels*"],
+    'analytics': ["*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*", "*/gen_204*"],
+}
+
+def lean_block_patterns(allowlist=()):
+    """Blocked URL patterns minus any category name or exact pattern listed in allowlist."""
+    allowlist = set(allowlist or ())
+    return [pattern for category, patterns in LEAN_BLOCK_PATTERNS.items() if category not in allowlist
+            for pattern in patterns if pattern not in allowlist]
+
+def build_chrome_options(params):
+    """params keys: 'headless', 'browsing_profile' ('default' or 'lean'), 'lean_allowlist', 'report_bandwidth'."""
+    headless = params.get('headless')
     options = Options()
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
@@ -103,81 +151,938 @@ def run_scraper(params, update_callback, stop_event):
     if headless:
         options.add_argument('--headless')
         options.add_argument("--window-size=1920,1080")
-        update_callback("-> Running in headless mode.")
+    if params.get('browsing_profile') == 'lean':
+        allowlist = set(params.get('lean_allowlist') or ())
+        if 'images' not in allowlist:
+            options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        if 'fonts' not in allowlist:
+            options.add_argument('--disable-remote-fonts')
+        options.add_argument('--mute-audio')
+    if reports_bandwidth(params):
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+    return options
 
-    driver = None
-    leads_found_this_run = 0
-    
-    try:
-        with open(filepath, 'a', newline='', encoding='utf-8-sig', buffering=1) as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            service = Service()
-            driver = webdriver.Chrome(service=service, options=options)
-            
-            query = f"{keyword} in {location}, {country}"
-            search_url = f"https://www.google.com/maps/search/{query.replace(' ', '+')}"
-            update_callback(f"Navigating to: {search_url}")
-            driver.get(search_url)
-
-            scrollable_feed_selector = 'div[role="feed"]'
-            scrollable_element = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, scrollable_feed_selector)))
-            
+def reports_bandwidth(params):
+    return params.get('report_bandwidth', params.get('browsing_profile') == 'lean')
+
+def apply_network_blocking(driver, params):
+    """Applies the lean profile's URL blocking to the current tab; CDP network settings are per tab, so call it for every new tab."""
+    if params.get('browsing_profile') == 'lean':
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': lean_block_patterns(params.get('lean_allowlist'))})
+
+def launch_driver(params, options=None):
+    """Starts Chrome with params' options and applies the network-level blocking of its browsing profile."""
+    driver = webdriver.Chrome(service=Service(), options=options or build_chrome_options(params))
+    apply_network_blocking(driver, params)
+    return driver
+
+class BandwidthMeter:
+    """Sums the encoded bytes of finished network requests from Chrome's performance log."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.take()
+
+    def take(self):
+        """Bytes transferred since the previous call, or None if the browser cannot report them."""
+        try: entries = self.driver.get_log('performance')
+        except Exception: return None
+        total = 0
+        for entry in entries:
+            message = json.loads(entry['message']).get('message', {})
+            if message.get('method') == 'Network.loadingFinished':
+                total += message.get('params', {}).get('encodedDataLength', 0)
+        return total
+
+class WarmDriverPool:
+    """Keeps one pre-launched Chrome around so consecutive runs skip the browser launch.
+
+    The warm browser is keyed by the options profile it was launched with; a run asking for a
+    different profile gets a fresh browser and the stale one is quit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.profile = None
+        self.driver = None
+
+    def prewarm(self, params, update_callback=print):
+        """Launches a browser for params' profile in the calling thread (meant for a background thread)."""
+        with self.lock:
+            if self.driver and self.profile == driver_profile(params): return
+            self._discard()
+            try:
+                self.driver = launch_driver(params)
+                self.driver.get("about:blank")
+                self.profile = driver_profile(params)
+                update_callback("-> Warm browser ready.")
+            except Exception as e:
+                update_callback(f"-> Could not pre-launch browser: {e}")
+
+    def acquire(self, params):
+        """Returns (driver, was_warm). Waits for an in-progress prewarm instead of launching a second browser.
+        A warm browser that was closed or crashed is discarded and a fresh one launched."""
+        with self.lock:
+            if self.driver:
+                try: self.driver.window_handles
+                except Exception: self._discard()
+            if self.driver and self.profile == driver_profile(params):
+                driver, self.driver, self.profile = self.driver, None, None
+                return driver, True
+            self._discard()
+        return launch_driver(params), False
+
+    def release(self, params, driver):
+        """Takes a run's driver back for the next run, or quits it if it is no longer usable."""
+        try:
+            for handle in driver.window_handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(driver.window_handles[0])
+            driver.get("about:blank")
+        except Exception:
+            try: driver.quit()
+            except Exception: pass
+            return
+        with self.lock:
+            self._discard()
+            self.driver, self.profile = driver, driver_profile(params)
+
+    def close(self):
+        with self.lock: self._discard()
+
+    def _discard(self):
+        if self.driver:
+            try: self.driver.quit()
+            except Exception: pass
+        self.driver, self.profile = None, None
+
+def driver_profile(params):
+    """The options that decide whether a warm browser can be reused."""
+    return (bool(params.get('headless')), params.get('browsing_profile', 'default'), tuple(sorted(params.get('lean_allowlist') or ())), bool(reports_bandwidth(params)))
+
+def build_search_url(keyword, location, country, base_url=None):
+    query = f"{keyword} in {location}, {country}"
+    return f"{(base_url or 'https://www.google.com').rstrip('/')}/maps/search/{query.replace(' ', '+')}"
+
+def harvest_listing_links(driver, seen_links):
+    """Returns (href, name) for feed listings not harvested yet and marks them as seen."""
+    new_links = []
+    for href, name in driver.execute_script(HARVEST_LINKS_JS, LISTING_LINK_SELECTOR) or []:
+        if not href or not name or href in seen_links: continue
+        seen_links.add(href)
+        new_links.append((href, name))
+    return new_links
+
+COUNT_LINKS_JS = "return document.querySelectorAll(arguments[0]).length;"
+DETAIL_ITEM_SELECTOR = "[data-item-id], [jsaction*='pane.openhours']"
+
+class PacingController:
+    """Readiness-based waits plus an adaptive delay factor shared by every browser of a run.
+
+    params keys: 'pacing' ('adaptive' or 'fixed'), 'wait_strategy' ('ready' waits for the page,
+    'sleep' keeps the old fixed sleeps), 'scroll_timeout', 'detail_timeout',
+    'pacing_min_factor', 'pacing_max_factor'. Scroll and detail-pane waits are timed into `metrics`.
+    """
+
+    def __init__(self, delays, params, update_callback, stop_event, metrics=None):
+        self.delays = delays
+        self.metrics = metrics or ScrapeMetrics()
+        self.adaptive = params.get('pacing', 'adaptive') == 'adaptive'
+        self.wait_strategy = params.get('wait_strategy', 'ready')
+        self.scroll_timeout = float(params.get('scroll_timeout', 10))
+        self.detail_timeout = float(params.get('detail_timeout', 15))
+        self.min_factor = float(params.get('pacing_min_factor', 0.1))
+        self.max_factor = float(params.get('pacing_max_factor', 4.0))
+        self.factor = 1.0
+        self.speedup, self.backoff, self.speedup_after = 0.75, 2.0, 5
+        self.healthy_streak = 0
+        self.update_callback = update_callback
+        self.stop_event = stop_event
+        self.lock = threading.Lock()
+        update_callback(f"-> Pacing: {'adaptive' if self.adaptive else 'fixed'} delays, '{self.wait_strategy}' waits.")
+
+    def pause(self, kind):
+        """Sleeps for a randomised '{kind}' delay scaled by the current factor; returns early on stop."""
+        with self.lock: factor = self.factor
+        self.stop_event.wait(random.uniform(*self.delays[kind]) * factor)
+
+    def record_success(self):
+        with self.lock:
+            self.healthy_streak += 1
+            if not self.adaptive or self.healthy_streak < self.speedup_after or self.factor <= self.min_factor: return
+            self.factor = max(self.min_factor, self.factor * self.speedup)
+            self.healthy_streak = 0
+            factor = self.factor
+        self.update_callback(f"  -> Pacing: responses healthy, speeding up (delay x{factor:.2f}).")
+
+    def record_failure(self, reason):
+        with self.lock:
+            self.healthy_streak = 0
+            if not self.adaptive or self.factor >= self.max_factor: return
+            self.factor = min(self.max_factor, self.factor * self.backoff)
+            factor = self.factor
+        self.update_callback(f"  -> Pacing: {reason}, backing off (delay x{factor:.2f}).")
+
+    def wait_for_feed_growth(self, driver, previous_count):
+        """Waits until the feed holds more listings than previous_count. Returns the new count."""
+        if self.wait_strategy == 'sleep':
+            self.pause('medium')
+            new_count = driver.execute_script(COUNT_LINKS_JS, LISTING_LINK_SELECTOR)
+        else:
+            try:
+                new_count = WebDriverWait(driver, self.scroll_timeout, poll_frequency=0.25).until(
+                    lambda d: (count := d.execute_script(COUNT_LINKS_JS, LISTING_LINK_SELECTOR)) > previous_count and count)
+            except TimeoutException:
+                new_count = previous_count
+        self.metrics.count('scrolls')
+        if new_count > previous_count: self.record_success()
+        else:
+            self.metrics.count('empty_scrolls')
+            self.record_failure("scroll revealed nothing")
+        return new_count
+
+    def wait_for_detail_pane(self, driver, listing_name):
+        """Waits for the pane header to show listing_name, then briefly for its data rows to render."""
+        with self.metrics.stage('wait'):
+            try:
+                WebDriverWait(driver, self.detail_timeout).until(EC.text_to_be_present_in_element((By.CSS_SELECTOR, HEADER_SELECTOR), listing_name))
+            except TimeoutException:
+                self.metrics.count('timeouts')
+                self.record_failure("detail pane timed out")
+                raise
+            if self.wait_strategy != 'sleep':
+                try: WebDriverWait(driver, 3, poll_frequency=0.2).until(EC.presence_of_element_located((By.CSS_SELECTOR, DETAIL_ITEM_SELECTOR)))
+                except TimeoutException: pass
+        self.record_success()
+
+def load_more_links(driver, scrollable_element, seen_links, pacing):
+    """Scrolls the feed once, waits for it to grow and returns the listings it revealed."""
+    with pacing.metrics.stage('scroll'):
+        previous_count = driver.execute_script(COUNT_LINKS_JS, LISTING_LINK_SELECTOR)
+        scrollable_element.send_keys(Keys.END)
+        pacing.wait_for_feed_growth(driver, previous_count)
+    return harvest_listing_links(driver, seen_links)
+
+def restore_feed_depth(driver, scrollable_element, seen_links, depth, pacing, update_callback):
+    """Re-scrolls a freshly loaded feed to a checkpointed depth and returns any listings it had not harvested."""
+    update_callback(f"-> Restoring feed scroll depth ({depth} scrolls)...")
+    for _ in range(depth):
+        previous_count = driver.execute_script(COUNT_LINKS_JS, LISTING_LINK_SELECTOR)
+        scrollable_element.send_keys(Keys.END)
+        try: WebDriverWait(driver, pacing.scroll_timeout, poll_frequency=0.25).until(lambda d: d.execute_script(COUNT_LINKS_JS, LISTING_LINK_SELECTOR) > previous_count)
+        except TimeoutException: break
+    return harvest_listing_links(driver, seen_links)
+
+def open_place(driver, href, listing_name, pacing):
+    """Navigates straight to a harvested place URL and waits for its detail pane."""
+    with pacing.metrics.stage('open'): driver.get(href)
+    pacing.wait_for_detail_pane(driver, listing_name)
+
+# --- BROWSER MEMORY ---
+
+# Removes the first arguments[2] listing cards (their whole row in the feed). Returns how many were removed.
+PRUNE_FEED_JS = """
+const feed = document.querySelector(arguments[0]);
+if (!feed) return 0;
+const links = Array.from(feed.querySelectorAll(arguments[1])).slice(0, arguments[2]);
+for (const link of links) {
+    let card = link;
+    while (card.parentElement && card.parentElement !== feed) card = card.parentElement;
+    card.remove();
+}
+return links.length;
+"""
+MEMORY_PROBE_JS = "return [performance.memory ? performance.memory.usedJSHeapSize : null, document.getElementsByTagName('*').length];"
+
+class MemoryGuard:
+    """Owns one browser and keeps its memory bounded on long runs: prunes processed cards from the results
+    feed and swaps in a fresh browser once the page grows past the limits. Callers read .driver (and .meter)
+    again after recycle() and resume from their own saved position.
+
+    params keys: 'prune_feed' (default True), 'feed_keep_cards' (cards left in the feed, default 10),
+    'browser_heap_limit_mb' (default 768), 'browser_node_limit' (DOM nodes, default 150000),
+    'memory_check_every' (pages between probes, default 20), 'recycle_every' (pages per browser, 0 = no limit).
+    """
+
+    def __init__(self, driver, params, update_callback, metrics, search_url=None):
+        self.driver = driver
+        self.params = params
+        self.update_callback = update_callback
+        self.metrics = metrics
+        self.search_url = search_url
+        self.meter = BandwidthMeter(driver) if reports_bandwidth(params) else None
+        self.prune_enabled = params.get('prune_feed', True)
+        self.keep_cards = int(params.get('feed_keep_cards', 10))
+        self.heap_limit = float(params.get('browser_heap_limit_mb', 768)) * 1024 * 1024
+        self.node_limit = int(params.get('browser_node_limit', 150000))
+        self.check_every = max(1, int(params.get('memory_check_every', 20)))
+        self.recycle_every = int(params.get('recycle_every', 0))
+        self.pages_since_launch = 0
+        self.reason = None
+
+    def prune_first(self, count):
+        """Drops the first `count` listing cards from the feed. Returns how many were removed."""
+        if not self.prune_enabled or count <= 0: return 0
+        try: return self.driver.execute_script(PRUNE_FEED_JS, FEED_SELECTOR, LISTING_LINK_SELECTOR, count) or 0
+        except Exception: return 0
+
+    def prune_harvested(self):
+        """Drops every feed card except the last few once their links have been harvested."""
+        if not self.prune_enabled: return 0
+        return self.prune_first(self.driver.execute_script(COUNT_LINKS_JS, LISTING_LINK_SELECTOR) - self.keep_cards)
+
+    def over_limit(self):
+        """Called once per page opened; probes the browser every `check_every` pages."""
+        self.pages_since_launch += 1
+        if self.recycle_every and self.pages_since_launch >= self.recycle_every:
+            self.reason = f"{self.pages_since_launch} pages since launch"
+            return True
+        if self.pages_since_launch % self.check_every: return False
+        try: heap, nodes = self.driver.execute_script(MEMORY_PROBE_JS)
+        except Exception: return False
+        if heap and heap > self.heap_limit: self.reason = f"JS heap {heap / 1024 / 1024:.0f} MB"
+        elif nodes and nodes > self.node_limit: self.reason = f"{nodes} DOM nodes"
+        else: return False
+        return True
+
+    def recycle(self):
+        """Quits the browser and launches a fresh one with the same profile. Returns the new driver."""
+        self.update_callback(f"-> Recycling browser ({self.reason}).")
+        try: self.driver.quit()
+        except Exception: pass
+        self.driver = launch_driver(self.params)
+        self.meter = BandwidthMeter(self.driver) if reports_bandwidth(self.params) else None
+        self.pages_since_launch = 0
+        self.metrics.count('recycles')
+        return self.driver
+
+    def reopen_feed(self, seen_links, depth, pacing):
+        """Loads the search in the fresh browser and scrolls back to `depth`.
+        Returns (scrollable_element, listings not in seen_links)."""
+        with self.metrics.stage('navigate'):
+            self.driver.get(self.search_url)
+            scrollable_element = WebDriverWait(self.driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, FEED_SELECTOR)))
+        if depth: return scrollable_element, restore_feed_depth(self.driver, scrollable_element, seen_links, depth, pacing, self.update_callback)
+        return scrollable_element, harvest_listing_links(self.driver, seen_links)
+
+class LeadWriter:
+    """Single owner of the output sink and of the dedup state; every lead goes through record().
+
+    Duplicates are checked against processed_addresses, then by normalized address, E.164 phone, place id
+    and similar names at the same site or in the same postal area (see dedup_index), both against the
+    persistent dedup_index when given and against this run's rows not committed to it yet. Rows still
+    buffered in the sink are only committed to the index (and their links marked done in the checkpoint)
+    once the sink has flushed them and reports them durable, so a crash never leaves the index or
+    checkpoint ahead of the output file; call sink_closed() after closing a sink that is only durable on close. record() is safe to call from several browser threads.
+    With an `enricher`, accepted leads are written once their website has been crawled in the background.
+    """
+
+    def __init__(self, sink, processed_addresses, target_leads, update_callback, dedup_index=None, source=None, checkpoint=None, run_started=None, metrics=None, enricher=None, country=None):
+        self.sink = sink
+        self.metrics = metrics or ScrapeMetrics()
+        self.processed_addresses = processed_addresses
+        self.target_leads = target_leads
+        self.update_callback = update_callback
+        self.dedup_index = dedup_index
+        self.source = source
+        self.checkpoint = checkpoint
+        self.run_started = run_started or time.time()
+        self.enricher = enricher
+        self.country = country
+        # Without a persistent index, the run's rows are never removed from here, so it dedups the whole run.
+        self.unflushed_index = MemoryIndex(dedup_index.threshold if dedup_index is not None else NAME_SIMILARITY)
+        self.unflushed = []
+        self.transfer_bytes = 0
+        self.transfer_samples = 0
+        self.leads_written = 0
+        self.target_reached = threading.Event()
+        self.lock = threading.Lock()
+
+    def record(self, lead_data, place_url=None, transfer_bytes=None):
+        """Writes the lead unless it is a duplicate. Returns True when a row was written.
+
+        transfer_bytes is the network traffic spent on this listing, when the browser reports it.
+        """
+        with self.lock: return self._record(lead_data, place_url, transfer_bytes)
+
+    def _record(self, lead_data, place_url, transfer_bytes):
+        if transfer_bytes is not None:
+            self.transfer_bytes += transfer_bytes
+            self.transfer_samples += 1
+        business_address = lead_data.get("Full Business Address")
+        with self.metrics.stage('dedup'):
+            duplicate_note = None
+            if business_address and business_address != "Not Found" and business_address in self.processed_addresses:
+                duplicate_note = "already in CSV"
+            else:
+                fingerprint = LeadFingerprint(lead_data, place_url, self.country)
+                match = self.unflushed_index.match(fingerprint) or (self.dedup_index.match(fingerprint) if self.dedup_index is not None else None)
+                if match: duplicate_note = f"same {match.reason}" if match.reason in ('address', 'phone', 'place') else match.reason
+                else: self.unflushed_index.add([fingerprint], lead_data.get('Business Name'))
+        if duplicate_note:
+            self.metrics.count('duplicates')
+            self.update_callback(f"  -> Duplicate found ({duplicate_note}): {lead_data.get('Business Name')}. Skipping.")
+            if self.checkpoint: self.checkpoint.mark_done([place_url])
+            self._flush_if_due()
+            return False
+        if self.enricher is not None:
+            self.enricher.submit(lead_data, lambda enriched_lead: self._write_enriched(enriched_lead, fingerprint, place_url))
+        else:
+            self._write(lead_data, fingerprint, place_url)
+        self.leads_written += 1
+        self.metrics.count('leads')
+        transfer_note = f" ({transfer_bytes / 1024:.0f} KB)" if transfer_bytes is not None else ""
+        self.update_callback(f"  -> Lead #{self.leads_written}: {lead_data.get('Business Name', 'N/A')}{transfer_note}")
+        if self.leads_written == 1:
+            self.update_callback(f"  -> Time to first lead: {time.time() - self.run_started:.1f}s")
+        if business_address and business_address != "Not Found":
+            self.processed_addresses.add(business_address)
+        if self.leads_written >= self.target_leads:
+            self.target_reached.set()
+        return True
+
+    def _write(self, lead_data, fingerprint, place_url):
+        with self.metrics.stage('write'): self.sink.writerow(lead_data)
+        self.unflushed.append((fingerprint, place_url))
+        if not self.sink.pending: self._commit_flushed()
+
+    def _flush_if_due(self):
+        # Caller holds self.lock.
+        self.sink.flush_if_due()
+        if not self.sink.pending: self._commit_flushed()
+
+    def _write_enriched(self, lead_data, fingerprint, place_url):
+        # Runs on an enrichment thread.
+        with self.lock:
+            try: self._write(lead_data, fingerprint, place_url)
+            except Exception as e: self.update_callback(f"  -> Could not write {lead_data.get('Business Name', 'N/A')}: {e}")
+
+    def flush_if_due(self):
+        """Applies the sink's time-based flush; the scraping loops call it between listings and scrolls so
+        buffered rows reach disk even through long streaks of duplicates, timeouts or empty scrolls."""
+        with self.lock: self._flush_if_due()
+
+    def flush(self):
+        """Waits for leads still being enriched, then flushes the sink and commits everything."""
+        if self.enricher is not None: self.enricher.drain()
+        with self.lock:
+            self.sink.flush()
+            self._commit_flushed()
+
+    def sink_closed(self):
+        """Commits the rows that only became durable when the sink was closed (Parquet)."""
+        with self.lock: self._commit_flushed()
+
+    def _commit_flushed(self):
+        """Commits the dedup keys and checkpoint links of rows the sink has flushed to disk."""
+        if not self.unflushed or not self.sink.durable: return
+        fingerprints = [fingerprint for fingerprint, _ in self.unflushed]
+        if self.dedup_index is not None:
+            if self.source: self.dedup_index.add_written(fingerprints, self.source)
+            else: self.dedup_index.add(fingerprints)
+            self.unflushed_index.remove(fingerprints)
+        if self.checkpoint: self.checkpoint.mark_done([place_url for _, place_url in self.unflushed])
+        self.unflushed = []
+
+# --- SCRAPING MODES ---
+
+def _run_serial(guard, scrollable_element, lead_writer, extract_details, pacing, update_callback, stop_event):
+    """One browser: hover and click each feed listing, then read its detail pane.
+
+    Listings are harvested into the checkpoint as the feed loads, with every scroll counted. On resume,
+    pending links are opened directly first, then the feed is restored to its saved depth and listings
+    already visited are skipped without being opened. Processed cards are pruned from the feed; after a
+    browser recycle the feed is re-scrolled the same way. Returns True once the end of the results is reached.
+    """
+    driver = guard.driver
+    checkpoint = lead_writer.checkpoint
+    done_links = checkpoint.done
+    seen_links = set(checkpoint.harvested)
+    visited_links = set()
+    checkpoint.add_harvested(harvest_listing_links(driver, seen_links))
+    processed_gmaps_link_count = 0
+    patience_counter = 0
+    max_patience = 3
+
+    pending_links = deque(checkpoint.pending_links()) if checkpoint.resumed else deque()
+    if pending_links:
+        update_callback(f"-> Opening {len(pending_links)} pending listings from the checkpoint directly...")
+    opened_pending = bool(pending_links)
+    while pending_links and not lead_writer.target_reached.is_set() and not stop_event.is_set():
+        lead_writer.flush_if_due()
+        if guard.over_limit():
+            lead_writer.flush()
+            driver = guard.recycle()
+        href, listing_name = pending_links.popleft()
+        visited_links.add(href)
+        try:
+            open_place(driver, href, listing_name, pacing)
+            with pacing.metrics.stage('extract'): lead_data = extract_details(driver)
+            lead_writer.record(lead_data, href, guard.meter.take() if guard.meter else None)
+        except TimeoutException:
+            update_callback(f"  -> Detail page timed out for {listing_name}. Skipping.")
+        except Exception as e:
+            pacing.metrics.count('errors')
+            update_callback(f"  -> An unexpected error occurred: {e}")
+    if opened_pending and not stop_event.is_set() and not lead_writer.target_reached.is_set():
+        scrollable_element, new_links = guard.reopen_feed(seen_links, checkpoint.scroll_depth, pacing)
+        checkpoint.add_harvested(new_links)
+    elif checkpoint.resumed and checkpoint.scroll_depth:
+        checkpoint.add_harvested(restore_feed_depth(driver, scrollable_element, seen_links, checkpoint.scroll_depth, pacing, update_callback))
+
+    while not lead_writer.target_reached.is_set():
+        lead_writer.flush_if_due()
+        if stop_event.is_set():
+            update_callback("-> Scraping stopped by user.")
+            break
+
+        if processed_gmaps_link_count > 2 * guard.keep_cards:
+            processed_gmaps_link_count -= guard.prune_first(processed_gmaps_link_count - guard.keep_cards)
+        all_links_on_page = driver.find_elements(By.CSS_SELECTOR, LISTING_LINK_SELECTOR)
+        if processed_gmaps_link_count >= len(all_links_on_page):
+            update_callback("-> All visible businesses processed, scrolling to load more...")
+            with pacing.metrics.stage('scroll'):
+                scrollable_element.send_keys(Keys.END)
+                new_link_count = pacing.wait_for_feed_growth(driver, len(all_links_on_page))
+            checkpoint.add_scroll()
+            checkpoint.add_harvested(harvest_listing_links(driver, seen_links))
+            if new_link_count == processed_gmaps_link_count:
+                patience_counter += 1
+                update_callback(f"  -> Scroll did not reveal new results. Patience: {patience_counter}/{max_patience}")
+                if patience_counter >= max_patience:
+                    update_callback("\n-> Reached the end of all search results.")
+                    return True
+            else: patience_counter = 0
+            continue
+        try:
+            link_to_process = all_links_on_page[processed_gmaps_link_count]
+            processed_gmaps_link_count += 1
+            listing_name = link_to_process.get_attribute("aria-label")
+            if not listing_name: continue
+            href = link_to_process.get_attribute("href")
+            if href in done_links or href in visited_links: continue
+            if guard.over_limit():
+                lead_writer.flush()
+                driver = guard.recycle()
+                scrollable_element, new_links = guard.reopen_feed(seen_links, checkpoint.scroll_depth, pacing)
+                checkpoint.add_harvested(new_links)
+                processed_gmaps_link_count = 0
+                continue
+
+            with pacing.metrics.stage('open'):
+                ActionChains(driver).move_to_element(link_to_process).perform()
+                pacing.pause('short')
+                driver.execute_script("arguments[0].click();", link_to_process)
+            pacing.wait_for_detail_pane(driver, listing_name)
+            with pacing.metrics.stage('extract'): lead_data = extract_details(driver)
+            lead_writer.record(lead_data, href, guard.meter.take() if guard.meter else None)
+            visited_links.add(href)
+        except StaleElementReferenceException:
+            update_callback("  -> Stale element detected. Re-evaluating page.")
             processed_gmaps_link_count = 0
-            patience_counter = 0
-            max_patience = 3
+            continue
+        except Exception as e:
+            pacing.metrics.count('errors')
+            update_callback(f"  -> An unexpected error occurred: {e}")
+            continue
+    return False
+
+def _run_direct(guard, scrollable_element, lead_writer, extract_details, pacing, update_callback, stop_event):
+    """One browser, link-harvest mode: the feed stays in its own tab and place URLs are opened directly in a second one.
+
+    On resume, the checkpoint's pending links are visited first and the feed is only re-scrolled to its
+    saved depth once they run out. Harvested cards are pruned from the feed, and a recycled browser
+    re-scrolls to the checkpoint's depth. Returns True once the end of the results is reached.
+    """
+    driver = guard.driver
+    checkpoint = lead_writer.checkpoint
+    seen_links = set(checkpoint.harvested)
+    pending_links = deque(checkpoint.pending_links())
+    restore_depth = checkpoint.scroll_depth if checkpoint.resumed else 0
+    new_links = harvest_listing_links(driver, seen_links)
+    checkpoint.add_harvested(new_links)
+    pending_links.extend(new_links)
+    feed_window = driver.current_window_handle
+    driver.switch_to.new_window('tab')
+    apply_network_blocking(driver, guard.params)
+    detail_window = driver.current_window_handle
+    patience_counter = 0
+    max_patience = 3
+
+    while not lead_writer.target_reached.is_set():
+        lead_writer.flush_if_due()
+        if stop_event.is_set():
+            update_callback("-> Scraping stopped by user.")
+            break
+
+        if not pending_links:
+            update_callback(f"-> All {len(seen_links)} harvested businesses processed, scrolling to load more...")
+            driver.switch_to.window(feed_window)
+            if restore_depth:
+                new_links = restore_feed_depth(driver, scrollable_element, seen_links, restore_depth, pacing, update_callback)
+                restore_depth = 0
+            else:
+                new_links = load_more_links(driver, scrollable_element, seen_links, pacing)
+                checkpoint.add_scroll()
+            guard.prune_harvested()
+            driver.switch_to.window(detail_window)
+            checkpoint.add_harvested(new_links)
+            if not new_links:
+                patience_counter += 1
+                update_callback(f"  -> Scroll did not reveal new results. Patience: {patience_counter}/{max_patience}")
+                if patience_counter >= max_patience:
+                    update_callback("\n-> Reached the end of all search results.")
+                    return True
+            else: patience_counter = 0
+            pending_links.extend(new_links)
+            continue
+        if guard.over_limit():
+            lead_writer.flush()
+            driver = guard.recycle()
+            scrollable_element, new_links = guard.reopen_feed(seen_links, checkpoint.scroll_depth, pacing)
+            restore_depth = 0
+            guard.prune_harvested()
+            checkpoint.add_harvested(new_links)
+            pending_links.extend(new_links)
+            feed_window = driver.current_window_handle
+            driver.switch_to.new_window('tab')
+            apply_network_blocking(driver, guard.params)
+            detail_window = driver.current_window_handle
+        href, listing_name = pending_links.popleft()
+        try:
+            open_place(driver, href, listing_name, pacing)
+            with pacing.metrics.stage('extract'): lead_data = extract_details(driver)
+            lead_writer.record(lead_data, href, guard.meter.take() if guard.meter else None)
+        except TimeoutException:
+            update_callback(f"  -> Detail page timed out for {listing_name}. Skipping.")
+        except Exception as e:
+            pacing.metrics.count('errors')
+            update_callback(f"  -> An unexpected error occurred: {e}")
+    return False
+
+def _pool_worker(worker_id, params, link_queue, lead_queue, extract_details, pacing, update_callback, stop_event, done_event, harvest_finished):
+    """Detail worker: owns its own Chrome and opens harvested place URLs directly."""
+    guard = None
+    try:
+        guard = MemoryGuard(launch_driver(params), params, update_callback, pacing.metrics)
+        update_callback(f"  -> Worker {worker_id} browser ready.")
+        while not stop_event.is_set() and not done_event.is_set():
+            try: href, listing_name = link_queue.get(timeout=0.5)
+            except queue.Empty:
+                if harvest_finished.is_set(): break
+                continue
+            if guard.over_limit(): guard.recycle()
+            try:
+                open_place(guard.driver, href, listing_name, pacing)
+                if stop_event.is_set() or done_event.is_set(): break
+                with pacing.metrics.stage('extract'): lead_data = extract_details(guard.driver)
+                lead_queue.put((lead_data, href, guard.meter.take() if guard.meter else None))
+            except TimeoutException:
+                update_callback(f"  -> Worker {worker_id}: detail page timed out for {listing_name}.")
+            except Exception as e:
+                pacing.metrics.count('errors')
+                update_callback(f"  -> Worker {worker_id}: an unexpected error occurred: {e}")
+            pacing.pause('short')
+    except Exception as e:
+        update_callback(f"  -> Worker {worker_id} could not start its browser: {e}")
+    finally:
+        if guard: guard.driver.quit()
+
+def _lead_writer_loop(lead_writer, lead_queue, update_callback, stop_event, errors):
+    """Drains worker results into the LeadWriter until a None sentinel arrives. A write error is kept in
+    `errors` and stops the pool, since nothing would read the queue any more."""
+    while True:
+        try: item = lead_queue.get(timeout=1)
+        except queue.Empty: item = ()
+        if item is None: break
+        try:
+            if not item: lead_writer.flush_if_due()
+            elif not lead_writer.target_reached.is_set(): lead_writer.record(*item)
+        except Exception as e:
+            errors.append(e)
+            update_callback(f"-> Could not write leads, stopping the workers: {e}")
+            stop_event.set()
+            break
+
+def _run_worker_pool(guard, scrollable_element, lead_writer, extract_details, pacing, params, worker_count, update_callback, stop_event):
+    """Producer/worker mode: this browser harvests listing links, worker browsers extract details.
 
-            while leads_found_this_run < target_leads:
-                if stop_event.is_set():
-                    update_callback("-> Scraping stopped by user.")
+    On resume, the checkpoint's pending links are queued up front so workers start on them while the
+    producer re-scrolls the feed to its saved depth. Returns True once the end of the results is reached.
+    """
+    driver = guard.driver
+    checkpoint = lead_writer.checkpoint
+    pending_links = checkpoint.pending_links()
+    link_queue = queue.Queue(maxsize=worker_count * 4 + len(pending_links))
+    for link in pending_links: link_queue.put(link)
+    lead_queue = queue.Queue()
+    done_event = lead_writer.target_reached
+    harvest_finished = threading.Event()
+    workers = [threading.Thread(target=_pool_worker, args=(i + 1, params, link_queue, lead_queue, extract_details, pacing, update_callback, stop_event, done_event, harvest_finished), daemon=True)
+               for i in range(worker_count)]
+    writer_errors = []
+    writer_thread = threading.Thread(target=_lead_writer_loop, args=(lead_writer, lead_queue, update_callback, stop_event, writer_errors), daemon=True)
+    writer_thread.start()
+    for worker in workers: worker.start()
+    update_callback(f"-> Started {worker_count} detail workers.")
+
+    seen_links = set(checkpoint.harvested)
+    reached_end = False
+    patience_counter = 0
+    max_patience = 3
+    try:
+        if checkpoint.resumed and checkpoint.scroll_depth:
+            new_links = restore_feed_depth(driver, scrollable_element, seen_links, checkpoint.scroll_depth, pacing, update_callback)
+        else:
+            new_links = harvest_listing_links(driver, seen_links)
+        checkpoint.add_harvested(new_links)
+        while not done_event.is_set():
+            if stop_event.is_set():
+                update_callback("-> Scraping stopped by user.")
+                break
+            if not any(worker.is_alive() for worker in workers):
+                update_callback("-> All detail workers have exited.")
+                break
+            for link in new_links:
+                while not (stop_event.is_set() or done_event.is_set()) and any(worker.is_alive() for worker in workers):
+                    try:
+                        link_queue.put(link, timeout=0.5)
+                        break
+                    except queue.Full: continue
+            if stop_event.is_set() or done_event.is_set(): continue
+
+            if new_links:
+                update_callback(f"-> Queued {len(new_links)} new listings ({len(seen_links)} harvested), scrolling to load more...")
+                patience_counter = 0
+            else:
+                patience_counter += 1
+                update_callback(f"  -> Scroll did not reveal new results. Patience: {patience_counter}/{max_patience}")
+                if patience_counter >= max_patience:
+                    update_callback("\n-> Reached the end of all search results.")
+                    reached_end = True
                     break
-                    
-                all_links_on_page = driver.find_elements(By.CSS_SELECTOR, "a.hfpxzc")
-                if processed_gmaps_link_count >= len(all_links_on_page):
-                    update_callback("-> All visible businesses processed, scrolling to load more...")
-                    scrollable_element.send_keys(Keys.END)
-                    time.sleep(random.uniform(*delays['medium']))
-                    new_link_count = len(driver.find_elements(By.CSS_SELECTOR, "a.hfpxzc"))
-                    if new_link_count == processed_gmaps_link_count:
-                        patience_counter += 1
-                        update_callback(f"  -> Scroll did not reveal new results. Patience: {patience_counter}/{max_patience}")
-                        if patience_counter >= max_patience:
-                            update_callback("\n-> Reached the end of all search results.")
-                            break
-                    else: patience_counter = 0
-                    continue
-                try:
-                    link_to_process = all_links_on_page[processed_gmaps_link_count]
-                    processed_gmaps_link_count += 1
-                    listing_name = link_to_process.get_attribute("aria-label")
-                    if not listing_name: continue
-                    
-                    ActionChains(driver).move_to_element(link_to_process).perform()
-                    time.sleep(random.uniform(*delays['short']))
-                    driver.execute_script("arguments[0].click();", link_to_process)
-                    header_selector = "h1.DUwDvf, h1.fontHeadlineLarge"
-                    WebDriverWait(driver, 15).until(EC.text_to_be_present_in_element((By.CSS_SELECTOR, header_selector), listing_name))
-                    lead_data = extract_business_details(driver)
-                    
-                    business_address = lead_data.get("Full Business Address")
-                    if business_address and business_address != "Not Found" and business_address in processed_addresses:
-                        update_callback(f"  -> Duplicate found (already in CSV): {lead_data.get('Business Name')}. Skipping.")
-                        continue
-                        
-                    writer.writerow(lead_data)
-                    update_callback(f"  -> Lead #{len(processed_addresses) + 1}: {lead_data.get('Business Name', 'N/A')}")
-                    leads_found_this_run += 1
-                    if business_address and business_address != "Not Found":
-                        processed_addresses.add(business_address)
-                except StaleElementReferenceException:
-                    update_callback("  -> Stale element detected. Re-evaluating page.")
-                    processed_gmaps_link_count = 0
-                    continue
-                except Exception as e:
-                    update_callback(f"  -> An unexpected error occurred: {e}")
-                    continue
-                if leads_found_this_run >= target_leads: break
+            guard.prune_harvested()
+            if guard.over_limit():
+                driver = guard.recycle()
+                scrollable_element, new_links = guard.reopen_feed(seen_links, checkpoint.scroll_depth, pacing)
+            else:
+                new_links = load_more_links(driver, scrollable_element, seen_links, pacing)
+                checkpoint.add_scroll()
+            checkpoint.add_harvested(new_links)
+    finally:
+        # Workers drain whatever is still queued, then exit once the queue is empty.
+        harvest_finished.set()
+        for worker in workers: worker.join()
+        lead_queue.put(None)
+        writer_thread.join()
+    if writer_errors: raise writer_errors[0]
+    return reached_end
+
+def _search_tile(guard, tile, params, scheduler, claimed_links, claimed_lock, lead_writer, extract_details, pacing, update_callback, stop_event):
+    """Harvests one viewport's feed. A feed that fills up is split into four smaller tiles instead of being
+    scraped; otherwise every listing no other tile has claimed yet is opened and recorded."""
+    driver = guard.driver
+    saturation = int(params.get('tile_saturation', 100))
+    max_depth = int(params.get('tile_max_depth', 3))
+    with pacing.metrics.stage('navigate'):
+        driver.get(build_tile_url(params['keyword'], tile, params.get('base_url')))
+        try: scrollable_element = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, FEED_SELECTOR)))
+        except TimeoutException:
+            update_callback(f"  -> {tile}: no results feed. Skipping.")
+            return
+
+    seen_links = set()
+    links = harvest_listing_links(driver, seen_links)
+    patience_counter = 0
+    while len(links) < saturation and patience_counter < 3 and not (stop_event.is_set() or lead_writer.target_reached.is_set()):
+        new_links = load_more_links(driver, scrollable_element, seen_links, pacing)
+        links.extend(new_links)
+        patience_counter = 0 if new_links else patience_counter + 1
+    if len(links) >= saturation and tile.depth < max_depth:
+        update_callback(f"  -> {tile}: dense ({len(links)}+ results), splitting into 4 smaller tiles.")
+        scheduler.add(tile.subdivide())
+        return
+
+    with claimed_lock:
+        fresh_links = []
+        for href, listing_name in links:
+            claim = extract_place_id(href) or href
+            if claim in claimed_links: continue
+            claimed_links.add(claim)
+            fresh_links.append((href, listing_name))
+    update_callback(f"-> {tile}: {len(fresh_links)} new listings ({len(links) - len(fresh_links)} already seen in other tiles).")
+    for href, listing_name in fresh_links:
+        lead_writer.flush_if_due()
+        if stop_event.is_set() or lead_writer.target_reached.is_set(): return
+        # Listings are opened by URL, so a recycled browser simply carries on with the next one.
+        if guard.over_limit(): driver = guard.recycle()
+        try:
+            open_place(driver, href, listing_name, pacing)
+            with pacing.metrics.stage('extract'): lead_data = extract_details(driver)
+            lead_writer.record(lead_data, href, guard.meter.take() if guard.meter else None)
+        except TimeoutException:
+            update_callback(f"  -> Detail page timed out for {listing_name}. Skipping.")
+        except Exception as e:
+            pacing.metrics.count('errors')
+            update_callback(f"  -> An unexpected error occurred: {e}")
+
+def _tile_worker(worker_id, guard, params, scheduler, claimed_links, claimed_lock, lead_writer, extract_details, pacing, update_callback, stop_event):
+    """Searches tiles until none are left. Worker 1 reuses the run's browser, the others launch their own."""
+    owns_driver = guard is None
+    try:
+        if owns_driver:
+            guard = MemoryGuard(launch_driver(params), params, update_callback, pacing.metrics)
+            update_callback(f"  -> Tile worker {worker_id} browser ready.")
+        while not stop_event.is_set() and not lead_writer.target_reached.is_set():
+            lead_writer.flush_if_due()
+            tile = scheduler.get()
+            if tile is None:
+                if scheduler.finished(): break
+                continue
+            try:
+                _search_tile(guard, tile, params, scheduler, claimed_links, claimed_lock, lead_writer, extract_details, pacing, update_callback, stop_event)
+            except Exception as e:
+                pacing.metrics.count('errors')
+                update_callback(f"  -> Tile worker {worker_id}: {tile} failed: {e}")
+            finally:
+                scheduler.task_done()
+    except Exception as e:
+        update_callback(f"  -> Tile worker {worker_id} could not start its browser: {e}")
+    finally:
+        if owns_driver and guard: guard.driver.quit()
+
+def _run_tiled(guard, lead_writer, extract_details, pacing, params, worker_count, update_callback, stop_event):
+    """Tiled mode: covers the location with a grid of viewport searches so a big city is not limited to the
+    ~120 results a single feed shows. Dense tiles are subdivided, and tiles are shared among worker_count browsers.
+
+    params keys: 'bounds' (south, west, north, east; geocoded from the location when missing), 'tile_grid'
+    (initial N x N grid), 'tile_saturation' (feed size treated as capped) and 'tile_max_depth'.
+    Returns True once every tile has been searched.
+    """
+    bounds = params.get('bounds')
+    if not bounds:
+        update_callback(f"-> Looking up the area of '{params['location']}, {params['country']}'...")
+        bounds = geocode_bounds(params['location'], params['country'])
+    grid = max(1, int(params.get('tile_grid', 3)))
+    scheduler = TileScheduler(split_bounds(bounds, grid, grid))
+    update_callback(f"-> Tiled search: {grid}x{grid} tiles over ({bounds[0]:.4f}, {bounds[1]:.4f}) -> ({bounds[2]:.4f}, {bounds[3]:.4f}) with {worker_count} browser(s).")
+    claimed_links, claimed_lock = set(), threading.Lock()
+    workers = [threading.Thread(target=_tile_worker, args=(i + 1, guard if i == 0 else None, params, scheduler, claimed_links, claimed_lock, lead_writer, extract_details, pacing, update_callback, stop_event), daemon=True)
+               for i in range(worker_count)]
+    for worker in workers: worker.start()
+    for worker in workers: worker.join()
+    update_callback(f"-> Searched {scheduler.searched} tiles.")
+    if stop_event.is_set(): update_callback("-> Scraping stopped by user.")
+    return scheduler.finished()
+
+def run_scraper(params, update_callback, stop_event):
+    """Runs one search end to end. Returns a summary dict (leads written, finished, error, elapsed, metrics)."""
+    keyword, location, country = params['keyword'], params['location'], params['country']
+    target_leads, headless, filepath, processed_addresses = params['target_leads'], params['headless'], params['filepath'], params['processed_addresses']
+    worker_count = max(1, int(params.get('workers', 1)))
+    navigation_mode = params.get('navigation_mode', 'click')
+    search_mode = params.get('search_mode', 'single')
+
+    delays = params.get('delays') or ({'short': (2, 4), 'medium': (4, 7), 'long': (7, 12)} if target_leads > 50 else {'short': (1, 2.5), 'medium': (2.5, 4), 'long': (4, 7)})
+
+    sink_policy = {'flush_rows': params.get('flush_rows', 10), 'flush_seconds': params.get('flush_seconds', 5.0), 'fsync': params.get('fsync', False)}
+
+    options = build_chrome_options(params)
+    if headless:
+        update_callback("-> Running in headless mode.")
+
+    metrics = ScrapeMetrics(params.get('metrics_path'), params.get('metrics_prometheus_path'), params.get('metrics_callback'),
+                            float(params.get('metrics_interval', 10)), {'query': f"{keyword} in {location}, {country}"})
+    pacing = PacingController(delays, params, update_callback, stop_event, metrics)
+
+    extraction_mode = params.get('extraction_mode', 'elements')
+    if extraction_mode not in EXTRACTION_MODES:
+        update_callback(f"-> Unknown extraction mode '{extraction_mode}', falling back to 'elements'.")
+        extraction_mode = 'elements'
+    extract_details = EXTRACTION_MODES[extraction_mode]
+    update_callback(f"-> Detail extraction mode: {extraction_mode}")
+
+    search_url = build_search_url(keyword, location, country, params.get('base_url'))
+    checkpoint = None
+    if search_mode != 'tiled':
+        checkpoint_path = params.get('checkpoint_path') or filepath + ".checkpoint.json"
+        checkpoint = Checkpoint.load_or_create(checkpoint_path, search_url, update_callback, params.get('resume', True))
+
+    enricher = None
+    headers = HEADERS
+    if params.get('enrich_websites'):
+        headers = HEADERS + ENRICHMENT_HEADERS
+        cache_path = params.get('enrichment_cache_path') or os.path.join(os.path.dirname(os.path.abspath(filepath)), "enrichment_cache.db")
+        enricher = WebsiteEnricher(cache_path, params.get('enrichment_workers', 8), float(params.get('enrichment_domain_interval', 1.0)),
+                                   update_callback=update_callback, metrics=metrics)
+        update_callback("-> Website enrichment on: emails and social links are fetched in the background.")
+
+    driver_pool = params.get('driver_pool')
+    guard = None
+    lead_writer = None
+    finished = False
+    error = None
+    run_started = time.time()
+
+    try:
+        with open_sink(filepath, headers, params.get('output_format'), **sink_policy) as sink:
+            lead_writer = LeadWriter(sink, processed_addresses, target_leads, update_callback, params.get('dedup_index'), os.path.abspath(filepath), checkpoint, run_started, metrics, enricher, country)
+            try:
+                if driver_pool:
+                    driver, was_warm = driver_pool.acquire(params)
+                    update_callback(f"-> {'Reusing warm browser' if was_warm else 'Launched new browser'} ({time.time() - run_started:.1f}s).")
+                else:
+                    driver = launch_driver(params, options)
+
+                guard = MemoryGuard(driver, params, update_callback, metrics, search_url)
+                if params.get('browsing_profile') == 'lean':
+                    update_callback("-> Lean browsing profile: blocking images, media, fonts, map tiles and analytics.")
+
+                if search_mode == 'tiled':
+                    reached_end = _run_tiled(guard, lead_writer, extract_details, pacing, params, worker_count, update_callback, stop_event)
+                else:
+                    update_callback(f"Navigating to: {search_url}")
+                    with metrics.stage('navigate'):
+                        driver.get(search_url)
+                        scrollable_element = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, FEED_SELECTOR)))
+
+                    if worker_count > 1:
+                        reached_end = _run_worker_pool(guard, scrollable_element, lead_writer, extract_details, pacing, params, worker_count, update_callback, stop_event)
+                    elif navigation_mode == 'direct':
+                        update_callback("-> Link-harvest mode: opening place URLs directly.")
+                        reached_end = _run_direct(guard, scrollable_element, lead_writer, extract_details, pacing, update_callback, stop_event)
+                    else:
+                        reached_end = _run_serial(guard, scrollable_element, lead_writer, extract_details, pacing, update_callback, stop_event)
+                finished = reached_end or lead_writer.target_reached.is_set()
+            finally:
+                lead_writer.flush()
     except Exception as e:
+        error = str(e)
+        metrics.count('errors')
         update_callback(f"\nAn unexpected error occurred in the main process: {e}")
     finally:
-        if driver: driver.quit()
-        update_callback("\nScraping Session Finished.")
\ No newline at end of file
+        if lead_writer: lead_writer.sink_closed()
+        if guard and driver_pool: driver_pool.release(params, guard.driver)
+        elif guard: guard.driver.quit()
+        if enricher:
+            enricher.close()
+            update_callback(f"-> Website enrichment: {enricher.pages_fetched} pages fetched, {enricher.cache_hits} served from cache.")
+        if checkpoint and finished:
+            checkpoint.complete()
+        elif checkpoint:
+            checkpoint.save()
+            update_callback("-> Progress saved to checkpoint; the next run with the same search resumes from it.")
+        leads_found_this_run = lead_writer.leads_written if lead_writer else 0
+        elapsed_minutes = (time.time() - run_started) / 60
+        if leads_found_this_run and elapsed_minutes > 0:
+            update_callback(f"-> {leads_found_this_run} leads in {elapsed_minutes:.1f} min ({leads_found_this_run / elapsed_minutes:.1f} leads/min, '{extraction_mode}' extraction).")
+        if lead_writer and lead_writer.transfer_samples:
+            update_callback(f"-> Network transfer: {lead_writer.transfer_bytes / 1024 / lead_writer.transfer_samples:.0f} KB per listing on average.")
+        metrics.close()
+        update_callback(f"-> Metrics: {metrics.summary_line()}")
+        update_callback("\nScraping Session Finished.")
+    return {'leads': lead_writer.leads_written if lead_writer else 0, 'finished': finished, 'stopped': stop_event.is_set(), 'error': error,
+            'elapsed_s': round(time.time() - run_started, 1), 'metrics': metrics.snapshot()}
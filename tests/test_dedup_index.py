@@ -0,0 +1,128 @@
+import csv
+import pytest
+
+from dedup_index import (LeadFingerprint, MemoryIndex, NAME_SIMILARITY, _name_match, dedupe_file, lead_keys, name_blocks,
+                         normalize_address, normalize_phone, postal_code)
+from output_sinks import read_rows
+
+def lead(name, address="Not Found", phone="Not Found", plus_code="Not Found"):
+    return {"Business Name": name, "Full Business Address": address, "Phone Number": phone, "Plus Code": plus_code}
+
+def match(first, second, first_url=None, second_url=None):
+    index = MemoryIndex()
+    index.add([LeadFingerprint(first, first_url, "USA")], "first")
+    return index.match(LeadFingerprint(second, second_url, "USA"))
+
+# --- NORMALIZATION ---
+
+@pytest.mark.parametrize("a, b", [
+    ("500 Congress Ave Ste 200, Austin, TX 78701", "500 Congress Avenue #200, Austin, TX 78701, USA"),
+    ("12 North Main Street, Suite 3", "12 N Main St Unit 3"),
+])
+def test_normalize_address_equivalent_forms(a, b):
+    assert normalize_address(a) == normalize_address(b)
+
+def test_normalize_address_keeps_different_units_apart():
+    assert normalize_address("500 Congress Ave Ste 200") != normalize_address("500 Congress Ave Ste 300")
+
+def test_normalize_address_missing():
+    assert normalize_address("Not Found") is None
+    assert normalize_address("") is None
+
+@pytest.mark.parametrize("phone, country, expected", [
+    ("(512) 555-0100", "USA", "+15125550100"),
+    ("+1 512-555-0100", None, "+15125550100"),
+    ("1 512 555 0100", "United States", "+15125550100"),
+    ("020 7946 0958", "UK", "+442079460958"),
+    ("0049 30 1234567", None, "+49301234567"),
+    ("512 555 0100", None, "5125550100"),
+])
+def test_normalize_phone(phone, country, expected):
+    assert normalize_phone(phone, country) == expected
+
+@pytest.mark.parametrize("phone", ["Not Found", "", "555-01"])
+def test_normalize_phone_rejects_missing_or_short(phone):
+    assert normalize_phone(phone, "USA") is None
+
+@pytest.mark.parametrize("address, expected", [
+    ("12345 Research Blvd, Austin, TX 78759", "78759"),
+    ("12345 Research Blvd Austin TX 78759", "78759"),
+    ("10 Downing St, London SW1A 2AA, UK", "sw1a2aa"),
+    ("1 Rue de Rivoli, 75001 Paris, France", "75001"),
+    ("100 Queen St W, Toronto, ON M5H 2N2, Canada", "m5h2n2"),
+    ("Not Found", None),
+])
+def test_postal_code(address, expected):
+    assert postal_code(address) == expected
+
+# --- BLOCKS ---
+
+def test_name_blocks_identity_and_areas():
+    data = lead("Austin Dental Care", "500 Congress Ave Ste 200, Austin, TX 78701", "(512) 555-0100", "GFQC+23 Austin, Texas")
+    blocks = dict(name_blocks(data, lead_keys(data, country="USA")))
+    assert set(blocks) == {"street:500 congress", "plus:gfqc+23 austin", "area:78701:aus", "area:austin:aus"}
+    assert set(blocks.values()) == {"500|200|+15125550100|"}
+
+def test_name_blocks_without_name_or_address():
+    assert name_blocks(lead("Not Found", "1 Main St, Austin, TX 78701")) == []
+    assert name_blocks(lead("Austin Dental Care")) == []
+
+# --- NAME MATCHING ---
+
+@pytest.mark.parametrize("first, second", [
+    (lead("Austin Dental Care", "500 Congress Ave, Austin, TX 78701"), lead("Austin Dental Care LLC", "500 Congress Avenue Ste 200, Austin, TX 78701")),
+    (lead("The Home Depot", "Not Found", plus_code="GFQC+23 Austin"), lead("Home Depot", "Not Found", plus_code="GFQC+23 Austin")),
+    (lead("Hilltop Auto Repair", "7 Oak Rd, Austin, TX 78702"), lead("Hilltop Auto Repair Shop", "7 Oak Road, Austin, TX 78702", "(512) 555-0100")),
+    (lead("Lakeside Family Dentistry", "88 Lake Dr, Austin, TX 78703"), lead("Lakeside Family Dentistry PC", "Lake Plaza, Austin, TX 78703", "(512) 555-0101")),
+])
+def test_same_business_matches(first, second):
+    assert match(first, second) is not None
+
+@pytest.mark.parametrize("first, second", [
+    # Similar names at one plus code with different phones.
+    (lead("Main Street Pizza", "Not Found", "(512) 555-1111", "GFQC+23 Austin"), lead("Main Street Pharmacy", "Not Found", "(512) 555-2222", "GFQC+23 Austin")),
+    (lead("Smith Law Firm", "200 Main St, Austin, TX 78701"), lead("Smith Law Group", "200 Main St, Ste 4, Austin, TX 78701")),
+    (lead("Dr. John Smith, DDS", "300 Main St, Austin, TX 78701"), lead("Dr. Jane Smith, DDS", "300 Main St, Ste 2, Austin, TX 78701")),
+    # Different suites, different house numbers, different phones.
+    (lead("Austin Dental Care", "500 Congress Ave Ste 200, Austin, TX 78701"), lead("Austin Dental Center", "500 Congress Ave Ste 300, Austin, TX 78701")),
+    (lead("Austin Dental Care", "500 Congress Ave, Austin, TX 78701"), lead("Austin Dental Care", "502 Congress Ave, Austin, TX 78701")),
+    (lead("Austin Dental Care", "500 Main St, Austin, TX 78701", "(512) 555-1111"), lead("Austin Dental Care", "500 Main St, Ste 1, Austin, TX 78701", "(512) 555-2222")),
+])
+def test_distinct_businesses_do_not_match(first, second):
+    assert match(first, second) is None
+
+def test_different_place_ids_veto_a_name_match():
+    first = lead("Austin Dental Care", "500 Main St, Austin, TX 78701")
+    second = lead("Austin Dental Care", "500 Main St, Ste 1, Austin, TX 78701")
+    assert match(first, second, "https://www.google.com/maps/place/x/data=!1s0x1:0xa", "https://www.google.com/maps/place/x/data=!1s0x1:0xb") is None
+    assert match(first, second) is not None
+
+def test_area_block_uses_the_threshold():
+    fingerprint = LeadFingerprint(lead("Bluebonnet Veterinary Clinic", "Not Found"))
+    fingerprint.blocks = [("area:78701:blu", "|||")]
+    assert _name_match(fingerprint, [("area:78701:blu", "bluebonnet veterinary clinic", "|||", "1")], NAME_SIMILARITY)
+    assert _name_match(fingerprint, [("area:78701:blu", "bluebonnet veterinary hospital", "|||", "1")], NAME_SIMILARITY) is None
+
+# --- BATCH PASS ---
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def test_dedupe_file_replaces_an_existing_output(tmp_path):
+    source, output = str(tmp_path / "in.csv"), str(tmp_path / "out.csv")
+    write_csv(source, [lead("Alpha Plumbing", "1 Main St, Austin, TX 78701"), lead("Alpha Plumbing", "1 Main St, Austin, TX 78701", "(512) 555-0100"),
+                       lead("Zeta Pipes", "9 Elm St, Dallas, TX 75201", "(512) 555-0100"), lead("Beta Bakery", "2 Oak St, Austin, TX 78701")])
+    for _ in range(2): assert dedupe_file(source, output, country="USA", update_callback=lambda message: None) == (4, 2)
+    rows = list(read_rows(output))
+    assert [row["Business Name"] for row in rows] == ["Alpha Plumbing", "Beta Bakery"]
+    assert rows[0]["Phone Number"] == "(512) 555-0100"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["in.csv", "out.csv"]
+
+def test_dedupe_file_refuses_to_overwrite_its_input(tmp_path):
+    source = str(tmp_path / "in.csv")
+    write_csv(source, [lead("Alpha Plumbing", "1 Main St, Austin, TX 78701")])
+    with pytest.raises(ValueError):
+        dedupe_file(source, source, update_callback=lambda message: None)
@@ -0,0 +1,86 @@
+# tiling.py (Splits a search area into lat/lng viewport tiles for the tiled search mode)
+
+import math, json, threading
+from collections import deque
+from urllib import request, parse
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+USER_AGENT = "gmaps-lead-scraper/1.0 (tiled search bounds)"
+
+class Tile:
+    """A lat/lng box searched as one Maps viewport. depth counts how often it was subdivided."""
+
+    def __init__(self, south, west, north, east, depth=0):
+        self.south, self.west, self.north, self.east, self.depth = south, west, north, east, depth
+
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    def zoom(self):
+        """The Maps zoom level whose viewport roughly covers this tile."""
+        span = max(self.east - self.west, (self.north - self.south) * 1.5, 1e-6)
+        return max(3, min(20, int(math.log2(360 / span)) + 1))
+
+    def subdivide(self):
+        lat, lng = self.center()
+        depth = self.depth + 1
+        return [Tile(self.south, self.west, lat, lng, depth), Tile(self.south, lng, lat, self.east, depth),
+                Tile(lat, self.west, self.north, lng, depth), Tile(lat, lng, self.north, self.east, depth)]
+
+    def __repr__(self):
+        return f"Tile({self.south:.4f},{self.west:.4f} -> {self.north:.4f},{self.east:.4f}, depth {self.depth})"
+
+def split_bounds(bounds, rows, cols):
+    """Splits (south, west, north, east) into a rows x cols grid of tiles."""
+    south, west, north, east = bounds
+    lat_step, lng_step = (north - south) / rows, (east - west) / cols
+    return [Tile(south + r * lat_step, west + c * lng_step, south + (r + 1) * lat_step, west + (c + 1) * lng_step)
+            for r in range(rows) for c in range(cols)]
+
+def build_tile_url(keyword, tile, base_url=None):
+    lat, lng = tile.center()
+    return f"{(base_url or 'https://www.google.com').rstrip('/')}/maps/search/{keyword.replace(' ', '+')}/@{lat:.6f},{lng:.6f},{tile.zoom()}z"
+
+def geocode_bounds(location, country, timeout=15):
+    """Looks up the bounding box (south, west, north, east) of a place with OpenStreetMap Nominatim."""
+    query = parse.urlencode({'q': f"{location}, {country}", 'format': 'json', 'limit': 1})
+    req = request.Request(f"{NOMINATIM_URL}?{query}", headers={'User-Agent': USER_AGENT})
+    with request.urlopen(req, timeout=timeout) as response:
+        results = json.loads(response.read().decode('utf-8'))
+    if not results:
+        raise ValueError(f"Could not find bounds for '{location}, {country}'.")
+    south, north, west, east = (float(value) for value in results[0]['boundingbox'])
+    return south, west, north, east
+
+class TileScheduler:
+    """Work list shared by the tile workers. A tile counts as outstanding until task_done(), so workers
+    keep waiting while another worker may still subdivide its tile into new ones."""
+
+    def __init__(self, tiles):
+        self.tiles = deque(tiles)
+        self.outstanding = len(self.tiles)
+        self.searched = 0
+        self.condition = threading.Condition()
+
+    def add(self, tiles):
+        with self.condition:
+            self.tiles.extend(tiles)
+            self.outstanding += len(tiles)
+            self.condition.notify_all()
+
+    def get(self, timeout=0.5):
+        """Returns the next tile, or None when nothing is queued right now (check finished())."""
+        with self.condition:
+            if not self.tiles and self.outstanding:
+                self.condition.wait(timeout)
+            return self.tiles.popleft() if self.tiles else None
+
+    def task_done(self):
+        with self.condition:
+            self.outstanding -= 1
+            self.searched += 1
+            self.condition.notify_all()
+
+    def finished(self):
+        with self.condition:
+            return self.outstanding == 0